@@ -0,0 +1,56 @@
+"""
+Compares Database.load() time of the snapshot and sharded layouts on a large synthetic dataset.
+
+Usage (from the No.punq folder):
+    python benchmarks/db_cold_start.py --guilds 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database
+from db_save_stall import build_dataset
+
+
+async def timed_load(path: str, storage: str):
+    db = Database(path, flush_interval=0, storage=storage)
+    start = time.perf_counter()
+    await db.load()
+    elapsed = time.perf_counter() - start
+    return db, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "database.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(build_dataset(args.guilds), f, indent=4, ensure_ascii=False)
+
+        _, snapshot = await timed_load(path, "snapshot")
+        # The first sharded start splits the snapshot, the second one is the real cold start
+        await timed_load(path, "sharded")
+        db, sharded = await timed_load(path, "sharded")
+
+        key = next(iter(db._shard_index))
+        start = time.perf_counter()
+        await db.read_guild_config(int(key))
+        first_access = time.perf_counter() - start
+
+        print(f"{args.guilds} guilds")
+        print(f"snapshot load          {snapshot * 1000:8.1f} ms")
+        print(f"sharded load           {sharded * 1000:8.1f} ms")
+        print(f"sharded first access   {first_access * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Measures how long Database.save() blocks the event loop on a large synthetic dataset.
+
+Usage (from the No.punq folder):
+    python benchmarks/db_save_stall.py --guilds 50000
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database
+
+
+def build_dataset(guilds: int):
+    template = {
+        "moderation": {"enabled": True, "bad_words": ["a", "b", "c"], "whitelist_links": ["youtube.com"],
+                       "log_channel": 1459326306964471879, "spam_protection": True, "link_protection": True, "scan_admins": False},
+        "social": {"youtube": [{"name": "kanal", "id": "UCSAzyZ9qPxbx1M3iniWtquQ", "last_video": "Eildl2KZ5xQ"}],
+                   "tiktok": [], "kick": [], "instagram": [], "notification_channel": 1459326306964471879},
+        "greeting": {"enabled": False, "channel_id": None, "morning_msg": "Günaydın! ☀️", "evening_msg": "İyi Akşamlar! 🌙",
+                     "morning_hour": 10, "morning_minute": 0, "evening_hour": 22, "evening_minute": 0},
+        "welcome": {"enabled": True, "channel_id": 1459326306964471879, "rules_channel_id": None, "message": "Hoş geldin {user}!",
+                    "leave_enabled": False, "leave_message": "Güle güle {user}!", "member_target": 100},
+        "auto_role": {"enabled": False, "role_id": None},
+        "feature_channel": {"enabled": False, "channel_id": None},
+        "users": {"1128010717749059584": {"warns": [{"reason": "Spam / Flood", "timestamp": "2026-01-10 02:29:49"}]}}
+    }
+    return {str(1424434077557067838 + i): copy.deepcopy(template) for i in range(guilds)}
+
+
+async def measure(coro_factory, runs: int):
+    """Runs the coroutine while a 1ms ticker records the worst scheduling delay."""
+    worst = []
+    for _ in range(runs):
+        stall = 0.0
+        done = False
+
+        async def ticker():
+            nonlocal stall
+            while not done:
+                before = time.perf_counter()
+                await asyncio.sleep(0.001)
+                stall = max(stall, time.perf_counter() - before - 0.001)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0.01)
+        await coro_factory()
+        done = True
+        await task
+        worst.append(stall)
+    return max(worst), sum(worst) / len(worst)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "database.json")
+        db = Database(path, flush_interval=0)
+        db.data = build_dataset(args.guilds)
+
+        async def legacy_save():
+            # Previous implementation: serialize on the loop, write through a thread
+            content = json.dumps(db.data, indent=4, ensure_ascii=False)
+            await asyncio.to_thread(lambda: open(path, "w", encoding="utf-8").write(content))
+
+        async def full_save():
+            db._dirty_guilds = set(db.data)
+            await db.save()
+
+        async def single_guild_save():
+            key = next(iter(db.data))
+            await db.update_guild_config(int(key), "moderation", "enabled", True)
+
+        await full_save()
+        print(f"{args.guilds} guilds, {os.path.getsize(path) / 1024 / 1024:.1f} MiB on disk")
+        for name, factory in (("legacy save", legacy_save), ("save, all guilds dirty", full_save), ("save, one guild dirty", single_guild_save)):
+            worst, mean = await measure(factory, args.runs)
+            print(f"{name:<24} loop stall worst {worst * 1000:8.1f} ms   mean {mean * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
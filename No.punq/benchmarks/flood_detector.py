@@ -0,0 +1,68 @@
+"""
+Measures flood detection throughput on max-length (4000 character) messages.
+
+Usage (from the No.punq folder):
+    python benchmarks/flood_detector.py --messages 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.flood import FloodLimits, detect_flood
+from utils.normalize import normalize
+
+MAX_LENGTH = 4000
+
+
+def build_messages(count: int, alphabet: str):
+    rng = random.Random(42)
+    return ["".join(rng.choice(alphabet) for _ in range(MAX_LENGTH)) for _ in range(count)]
+
+
+def legacy_check(content: str) -> bool:
+    # Previous implementation: one str.count() per distinct character
+    content_lower = content.lower()
+    content_stripped = "".join(content_lower.split())
+    if len(content_lower) > 10:
+        for char in set(content_stripped):
+            if content_stripped.count(char) > len(content_stripped) * 0.6 and len(content_stripped) > 5:
+                return True
+    return False
+
+
+def run(name: str, func, messages):
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {len(messages) / elapsed:10.0f} msgs/sec   {elapsed / len(messages) * 1e6:8.1f} us/msg")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    limits = FloodLimits.from_config({})
+    rng = random.Random(7)
+    alphabets = {
+        "turkish text": "abcçdefgğhıijklmnoöprsştuüvyz ABCÇDEFGĞHIİJKLMNOÖPRSŞTUÜVYZ0123456789.,!?😀🔥",
+        # Wide alphabets are the worst case for the per-character count() loop
+        "2000 distinct characters": "".join(chr(rng.randrange(0x4E00, 0x9FFF)) for _ in range(2000))
+    }
+    for label, alphabet in alphabets.items():
+        messages = build_messages(args.messages, alphabet)
+        normalized = [(m, normalize(m).stripped) for m in messages]
+        print(f"{label}, {MAX_LENGTH} characters per message")
+        run("legacy set/count loop", legacy_check, messages)
+        run("detect_flood", lambda pair: detect_flood(pair[0], pair[1], limits), normalized)
+        # Shared with the bad word and link checks, so not part of the flood rule itself
+        run("normalize()", normalize, messages)
+
+
+if __name__ == "__main__":
+    main()
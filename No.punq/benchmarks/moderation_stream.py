@@ -0,0 +1,308 @@
+"""
+Replays synthetic (or recorded) message streams through Moderation.on_message, offline.
+
+Discord objects are small fakes and the cog's `db` is replaced by an in-memory stub, so
+no token or connection is needed. For every corpus it reports handler latency (p50/p99),
+sustained messages per second and the peak memory traced per message.
+
+Usage (from the No.punq folder):
+    python benchmarks/moderation_stream.py --messages 20000
+    python benchmarks/moderation_stream.py --corpus raid --corpus clean
+    python benchmarks/moderation_stream.py --replay messages.jsonl
+
+Recorded corpora are JSON lines: {"content": "...", "author": 1, "channel": 1, "guild": 1}
+(only "content" is required), or plain text with one message per line.
+
+Each corpus is followed by its hits per rule. As a regression gate, --max-p99-us /
+--min-rate make the script exit with status 1 when any corpus is slower than the given
+limits, and --fail-on-clean-hits when any rule fires on the clean corpus.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cogs.moderation as moderation
+from utils.database import DEFAULT_GUILD_CONFIG
+
+CORPORA = ("clean", "profanity", "links", "flood", "spam", "raid", "mixed")
+WORDS = ("selam", "nasılsın", "bugün", "maç", "oyun", "akşam", "geliyor", "musun", "güzel", "harika", "evet",
+         "hayır", "tamam", "yarın", "sunucu", "kanal", "müzik", "film", "izledin", "bence", "çok", "iyi",
+         "hello", "anyone", "playing", "tonight", "ranked", "lobby", "lol", "gg", "wp", "discord")
+DOMAINS = ("youtube.com", "www.youtube.com", "youtu.be", "google.com", "free-nitro-gift.xyz", "steamcommunity.ru",
+           "github.com", "cdn.discordapp.com", "bit.ly", "twitch.tv")
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, *args, **kwargs):
+        return None
+
+    async def delete_messages(self, messages, reason=None):
+        return None
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, channels: int):
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+        self.owner_id = 1
+        self.roles = [SimpleNamespace(id=guild_id, permissions=SimpleNamespace(administrator=False, manage_guild=False))]
+        self.members = {}
+        self.channels = {guild_id * 100 + i: FakeChannel(guild_id * 100 + i) for i in range(channels)}
+
+    def get_member(self, user_id: int):
+        return self.members.get(user_id)
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    get_channel_or_thread = get_channel
+
+    def member(self, user_id: int) -> "FakeMember":
+        member = self.members.get(user_id)
+        if member is None:
+            member = self.members[user_id] = FakeMember(user_id, self)
+        return member
+
+
+class FakeMember:
+    bot = False
+    display_avatar = SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png")
+
+    def __init__(self, user_id: int, guild: FakeGuild):
+        self.id = user_id
+        self.guild = guild
+        self.roles = guild.roles[:1]
+        self.mention = f"<@{user_id}>"
+
+    def __str__(self):
+        return f"user-{self.id}"
+
+    async def send(self, *args, **kwargs):
+        return None
+
+    async def timeout(self, *args, **kwargs):
+        return None
+
+    async def kick(self, *args, **kwargs):
+        return None
+
+
+class FakeMessage:
+    __slots__ = ("id", "content", "author", "guild", "channel", "webhook_id")
+
+    def __init__(self, message_id: int, content: str, author: FakeMember, channel: FakeChannel):
+        self.id = message_id
+        self.content = content
+        self.author = author
+        self.guild = author.guild
+        self.channel = channel
+        self.webhook_id = None
+
+    async def delete(self):
+        return None
+
+
+class StubDatabase:
+    """The parts of Database the cog touches, backed by one shared guild config."""
+
+    def __init__(self, config):
+        self.config = config
+        self.warns = {}
+
+    async def read_guild_config(self, guild_id: int):
+        return self.config
+
+    async def get_guild_config(self, guild_id: int):
+        return self.config
+
+    async def add_warn(self, guild_id: int, user_id: int, reason: str) -> int:
+        key = (guild_id, user_id)
+        self.warns[key] = self.warns.get(key, 0) + 1
+        return self.warns[key]
+
+    def subscribe(self, callback, module=None):
+        pass
+
+    def unsubscribe(self, callback):
+        pass
+
+
+class FakeBot:
+    user = SimpleNamespace(id=2, mention="<@2>")
+
+    async def is_owner(self, user) -> bool:
+        return False
+
+
+def sentence(rng: random.Random, length: int = 0) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length or rng.randint(2, 14)))
+
+
+def obfuscate(rng: random.Random, word: str) -> str:
+    style = rng.randrange(4)
+    if style == 0:
+        return " ".join(word)
+    if style == 1:
+        return word.replace("a", "4").replace("e", "3").replace("i", "1").replace("o", "0")
+    if style == 2:
+        return "\u200b".join(word)
+    return word.upper()
+
+
+def generate(corpus: str, count: int, bad_words, seed: int = 42):
+    """Yields (guild, channel, author, content) tuples as indexes into the fake world."""
+    rng = random.Random(seed)
+    for i in range(count):
+        guild, channel, author = rng.randrange(10), rng.randrange(5), rng.randrange(5000)
+        kind = rng.choice(CORPORA[:-1]) if corpus == "mixed" else corpus
+
+        if kind == "clean":
+            content = sentence(rng)
+        elif kind == "profanity":
+            words = sentence(rng).split()
+            words.insert(rng.randrange(len(words) + 1), obfuscate(rng, rng.choice(bad_words)))
+            content = " ".join(words)
+        elif kind == "links":
+            url = f"https://{rng.choice(DOMAINS)}/{rng.randrange(10 ** 6)}"
+            content = rng.choice((f"{sentence(rng)} {url}", url, f"discord.gg/{rng.randrange(10 ** 6):x}"))
+        elif kind == "flood":
+            content = rng.choice((
+                rng.choice("aeıou!?") * rng.randint(20, 400),
+                ("spam " * rng.randint(20, 200)).strip(),
+                "😀" * rng.randint(16, 60),
+                " ".join(f"<@{rng.randrange(10 ** 17, 10 ** 18)}>" for _ in range(rng.randint(6, 20)))
+            ))
+        elif kind == "spam":
+            # A handful of members posting as fast as the stream replays
+            author = rng.randrange(20)
+            content = sentence(rng, 3)
+        else:
+            # Copy-paste raid: many fresh accounts, one channel, near-identical text
+            guild, channel, author = 0, 0, 10000 + rng.randrange(500)
+            content = f"join now free nitro giveaway for everyone {'!' * rng.randint(1, 3)}"
+        yield guild, channel, author, content
+
+
+def load_recording(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                entry = line
+            if not isinstance(entry, dict):
+                entry = {"content": str(entry)}
+            yield (entry.get("guild", 0) % 10, entry.get("channel", 0) % 5, entry.get("author", 0), entry["content"])
+
+
+def build_stream(entries, guilds):
+    messages = []
+    for i, (guild, channel, author, content) in enumerate(entries):
+        world = guilds[guild]
+        channel = world.channels[world.id * 100 + channel]
+        messages.append(FakeMessage(10 ** 18 + i, content, world.member(1000 + author), channel))
+    return messages
+
+
+def build_config(corpus: str):
+    config = {module: dict(values) for module, values in DEFAULT_GUILD_CONFIG.items() if isinstance(values, dict)}
+    config["moderation"].update({
+        "enabled": True, "link_protection": True, "whitelist_links": ["youtube.com", "youtu.be", "github.com"],
+        "raid_protection": True,
+        # Replay is far faster than real chat, so organic corpora would trip the rate limit
+        "spam_protection": corpus in ("spam", "mixed")
+    })
+    return config
+
+
+async def replay(messages, config, trace: bool = False):
+    """Runs every message through a fresh cog.
+
+    Returns per-message latency (ns), peak traced bytes and the cog's rule stats."""
+    moderation.db = StubDatabase(config)
+    cog = moderation.Moderation(FakeBot())
+    latencies, peaks = [], []
+    try:
+        for message in messages:
+            if trace:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+            start = time.perf_counter_ns()
+            await cog.on_message(message)
+            latencies.append(time.perf_counter_ns() - start)
+            if trace:
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - before)
+            # Let the queued punishments run outside the timed section
+            await asyncio.sleep(0)
+    finally:
+        await cog.cog_unload()
+    return latencies, peaks, cog.rules.stats()
+
+
+def percentile(values, p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--corpus", action="append", choices=CORPORA, help="Repeatable, defaults to all corpora")
+    parser.add_argument("--replay", help="Recorded JSON lines / text corpus to replay instead")
+    parser.add_argument("--trace-messages", type=int, default=2000, help="Messages replayed under tracemalloc")
+    parser.add_argument("--max-p99-us", type=float, default=0, help="Fail if any corpus has a higher p99")
+    parser.add_argument("--min-rate", type=float, default=0, help="Fail if any corpus is slower (msgs/sec)")
+    parser.add_argument("--fail-on-clean-hits", action="store_true", help="Fail if any rule fires on the clean corpus")
+    args = parser.parse_args()
+
+    with open("utils/bad_words.json", "r", encoding="utf-8") as f:
+        bad_words = [word for words in json.load(f).values() for word in words]
+    guilds = [FakeGuild(900000000000000000 + i, 5) for i in range(10)]
+
+    if args.replay:
+        runs = {os.path.basename(args.replay): (list(load_recording(args.replay)), "mixed")}
+    else:
+        runs = {name: (list(generate(name, args.messages, bad_words)), name) for name in args.corpus or CORPORA}
+
+    failed = False
+    print(f"{'corpus':<16} {'msgs':>7} {'msgs/sec':>10} {'p50 us':>8} {'p99 us':>8} {'KiB/msg':>8}")
+    for name, (entries, kind) in runs.items():
+        config = build_config(kind)
+        started = time.perf_counter()
+        latencies, _, stats = await replay(build_stream(entries, guilds), config)
+        rate = len(latencies) / (time.perf_counter() - started)
+
+        tracemalloc.start()
+        _, peaks, _ = await replay(build_stream(entries[:args.trace_messages], guilds), config, trace=True)
+        tracemalloc.stop()
+
+        latencies.sort()
+        p50, p99 = percentile(latencies, 0.5) / 1000, percentile(latencies, 0.99) / 1000
+        peak = sum(peaks) / len(peaks) / 1024 if peaks else 0
+        print(f"{name:<16} {len(latencies):>7} {rate:>10.0f} {p50:>8.1f} {p99:>8.1f} {peak:>8.1f}")
+        print(f"{'':<16} hits: " + ", ".join(f"{rule['name']}={rule['hits']}" for rule in stats))
+
+        if (args.max_p99_us and p99 > args.max_p99_us) or (args.min_rate and rate < args.min_rate):
+            failed = True
+        if args.fail_on_clean_hits and kind == "clean" and any(rule["hits"] for rule in stats):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
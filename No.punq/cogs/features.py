@@ -26,7 +26,7 @@ class Features(commands.Cog):
         """Periodically updates the feature info message in designated channels."""
         for guild in self.bot.guilds:
             try:
-                config = await db.get_guild_config(guild.id)
+                config = await db.read_guild_config(guild.id)
                 f_config = config.get("feature_channel", {})
                 
                 if f_config.get("enabled") and f_config.get("channel_id"):
@@ -192,8 +192,7 @@ class Features(commands.Cog):
                 # If channel exists, update its permissions to match the requirement
                 await channel.edit(overwrites=overwrites)
             
-            await db.update_guild_config(guild.id, "feature_channel", "enabled", True)
-            await db.update_guild_config(guild.id, "feature_channel", "channel_id", channel.id)
+            await db.update_guild_config_many(guild.id, "feature_channel", {"enabled": True, "channel_id": channel.id})
             
             config = await db.get_guild_config(guild.id)
             await self.send_feature_panel(channel, config)
@@ -207,7 +206,7 @@ class Features(commands.Cog):
         guild = self.bot.get_guild(guild_id)
         if not guild: return
         
-        config = await db.get_guild_config(guild_id)
+        config = await db.read_guild_config(guild_id)
         f_config = config.get("feature_channel", {})
         
         if f_config.get("enabled") and f_config.get("channel_id"):
@@ -221,8 +220,7 @@ class Features(commands.Cog):
         """Manually triggers the feature panel in the current channel for testing."""
         config = await db.get_guild_config(ctx.guild.id)
         # Update config to use THIS channel for future updates
-        await db.update_guild_config(ctx.guild.id, "feature_channel", "enabled", True)
-        await db.update_guild_config(ctx.guild.id, "feature_channel", "channel_id", ctx.channel.id)
+        await db.update_guild_config_many(ctx.guild.id, "feature_channel", {"enabled": True, "channel_id": ctx.channel.id})
         
         await self.send_feature_panel(ctx.channel, config)
         if ctx.interaction:
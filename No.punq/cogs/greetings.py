@@ -1,16 +1,38 @@
 import discord
 from discord.ext import commands, tasks
-from utils.database import db
+from utils.database import ConfigChange, db
 from utils.ui import PremiumEmbed
 import datetime
 
 class Greetings(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # {guild_id: ((morning_hour, morning_minute), (evening_hour, evening_minute))} for
+        # guilds with greetings enabled. Built on the first tick, then patched on config changes.
+        self.schedule = None
+        self.stale_guilds = set()
+        db.subscribe(self.on_config_change, "greeting")
         self.check_time.start()
 
     def cog_unload(self):
         self.check_time.cancel()
+        db.unsubscribe(self.on_config_change)
+
+    def on_config_change(self, change: ConfigChange):
+        self.stale_guilds.add(change.guild_id)
+
+    async def refresh_schedule(self, guild_id: str):
+        config = await db.read_guild_config(guild_id)
+        greeting_config = config.get("greeting", {})
+        if not greeting_config.get("enabled", False) or not greeting_config.get("channel_id"):
+            self.schedule.pop(guild_id, None)
+            return
+
+        # Get custom times or use defaults (10:00 and 22:00)
+        self.schedule[guild_id] = (
+            (greeting_config.get("morning_hour", 10), greeting_config.get("morning_minute", 0)),
+            (greeting_config.get("evening_hour", 22), greeting_config.get("evening_minute", 0))
+        )
 
     @tasks.loop(minutes=1)
     async def check_time(self):
@@ -19,32 +41,28 @@ class Greetings(commands.Cog):
         now = now_utc + datetime.timedelta(hours=3)
         print(f"[DEBUG] Turkey Time Check: {now.strftime('%H:%M:%S')}")
         
-        # Iterate over all guilds to check their custom times
-        for guild in self.bot.guilds:
+        if self.schedule is None:
+            await self.bot.wait_until_ready()
+            self.schedule = {}
+            self.stale_guilds.update(str(guild.id) for guild in self.bot.guilds)
+        stale, self.stale_guilds = self.stale_guilds, set()
+        for guild_id in stale:
+            await self.refresh_schedule(guild_id)
+
+        # Only guilds with greetings enabled are checked
+        current = (now.hour, now.minute)
+        for guild_id, (morning, evening) in list(self.schedule.items()):
+            guild = self.bot.get_guild(int(guild_id))
+            if not guild:
+                continue
             try:
-                config = await db.get_guild_config(guild.id)
-                greeting_config = config.get("greeting", {})
-                
-                if not greeting_config.get("enabled", False):
-                    continue
-                
-                channel_id = greeting_config.get("channel_id")
-                if not channel_id:
-                    continue
-                
-                # Get custom times or use defaults (10:00 and 22:00)
-                morning_hour = greeting_config.get("morning_hour", 10)
-                morning_minute = greeting_config.get("morning_minute", 0)
-                evening_hour = greeting_config.get("evening_hour", 22)
-                evening_minute = greeting_config.get("evening_minute", 0)
-                
                 # Check for morning time
-                if now.hour == morning_hour and now.minute == morning_minute:
+                if current == morning:
                     print(f"[INFO] Sending morning greeting to {guild.name}")
                     await self.send_greeting_to_guild(guild, "morning")
                 
                 # Check for evening time
-                elif now.hour == evening_hour and now.minute == evening_minute:
+                elif current == evening:
                     print(f"[INFO] Sending evening greeting to {guild.name}")
                     await self.send_greeting_to_guild(guild, "evening")
             except Exception as e:
@@ -52,7 +70,7 @@ class Greetings(commands.Cog):
 
     async def send_greeting_to_guild(self, guild, type: str):
         """Send greeting to a specific guild"""
-        config = await db.get_guild_config(guild.id)
+        config = await db.read_guild_config(guild.id)
         greeting_config = config.get("greeting", {})
         
         channel_id = greeting_config.get("channel_id")
@@ -138,27 +156,18 @@ class Greetings(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        # Get current config
-        config = await db.get_guild_config(ctx.guild.id)
-        if "greeting" not in config:
-            config["greeting"] = {}
-        
-        # Update the appropriate time
-        if tip.lower() in ["sabah", "morning"]:
-            config["greeting"]["morning_hour"] = saat
-            config["greeting"]["morning_minute"] = dakika
-            time_type = "Sabah"
-            emoji = "☀️"
-        else:
-            config["greeting"]["evening_hour"] = saat
-            config["greeting"]["evening_minute"] = dakika
-            time_type = "Akşam"
-            emoji = "🌙"
-        
-        # Save to database
-        full_config = await db.get_guild_config(ctx.guild.id)
-        full_config["greeting"] = config["greeting"]
-        await db.set(str(ctx.guild.id), full_config)
+        # Update the appropriate time (saved to the database when the block exits)
+        async with db.transaction(ctx.guild.id) as config:
+            if tip.lower() in ["sabah", "morning"]:
+                config["greeting"]["morning_hour"] = saat
+                config["greeting"]["morning_minute"] = dakika
+                time_type = "Sabah"
+                emoji = "☀️"
+            else:
+                config["greeting"]["evening_hour"] = saat
+                config["greeting"]["evening_minute"] = dakika
+                time_type = "Akşam"
+                emoji = "🌙"
         
         # Send confirmation
         embed = PremiumEmbed(
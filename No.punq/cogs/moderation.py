@@ -1,19 +1,197 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
+import asyncio
 import datetime
-from utils.database import db
+from utils.actions import ActionExecutor
+from utils.database import ConfigChange, db
+from utils.flood import FloodLimits, detect_flood
+from utils.links import INVITE_PATTERN, Blocklist, DomainTrie
+from utils.matcher import TermMatcher
+from utils.modlog import ModLogBatcher
+from utils.normalize import NormalizedText
+from utils.patterns import MAX_PATTERNS, PatternSet, PatternWorker, UnsafePattern, compile_pattern
+from utils.raid import RaidDetector
+from utils.rules import ContentHashes, MessageContext, Rule, RuleEngine, Verdict
+from utils.spam import SpamTracker
 from utils.ui import PremiumEmbed
-import re
 from typing import Optional
 
+
+class SpamRule(Rule):
+    """Too many messages from one member within the guild's spam window."""
+    name = "spam"
+    cost = 1
+    inputs = ("message", "author")
+    # An edit is not a new message
+    edits = False
+
+    def __init__(self, tracker: SpamTracker):
+        self.tracker = tracker
+
+    def enabled(self, config):
+        return config.get("spam_protection", False)
+
+    def check(self, ctx):
+        message = ctx.message
+        flood = self.tracker.hit(
+            message.guild.id, message.author.id, message.channel.id, message.id,
+            ctx.config.get("spam_threshold", 5), ctx.config.get("spam_window", 5)
+        )
+        return Verdict("Spam / Flood", messages=flood) if flood else None
+
+
+class InviteRule(Rule):
+    """Discord invites, blocked as ads while link protection is on."""
+    name = "invite"
+    cost = 2
+    inputs = ("content",)
+
+    def enabled(self, config):
+        return config.get("link_protection", False)
+
+    def check(self, ctx):
+        return Verdict("Reklam (Discord Invite)") if INVITE_PATTERN.search(ctx.content.text) else None
+
+
+class PhishingRule(Rule):
+    """Known phishing domains, removed even when link protection is off."""
+    name = "phishing"
+    cost = 3
+    inputs = ("hosts",)
+
+    def __init__(self, blocklist: Blocklist):
+        self.blocklist = blocklist
+
+    def check(self, ctx):
+        for host in ctx.hosts:
+            listed = self.blocklist.match(host)
+            if listed:
+                return Verdict("Zararlı Link (Phishing)", listed)
+        return None
+
+
+class LinkRule(Rule):
+    """Every host must be (a subdomain of) a whitelisted domain."""
+    name = "links"
+    cost = 4
+    inputs = ("hosts",)
+
+    def __init__(self, cog: "Moderation"):
+        self.cog = cog
+
+    def enabled(self, config):
+        return config.get("link_protection", False)
+
+    def check(self, ctx):
+        hosts = ctx.hosts
+        if not hosts:
+            return None
+        whitelist = self.cog.get_link_whitelist(ctx.message.guild.id, ctx.config)
+        if all(whitelist.matches(host) for host in hosts):
+            return None
+        return Verdict("Reklam / Yasaklı Link")
+
+
+class FloodRule(Rule):
+    """Repeated characters / text, emoji and mention floods."""
+    name = "flood"
+    cost = 5
+    inputs = ("message", "content")
+
+    def check(self, ctx):
+        reason = detect_flood(ctx.message.content, ctx.content.stripped, FloodLimits.from_config(ctx.config))
+        return Verdict(reason) if reason else None
+
+
+class BadWordRule(Rule):
+    """Custom and global bad words, in every normalized form of the message."""
+    name = "bad_words"
+    cost = 6
+    inputs = ("content",)
+
+    def __init__(self, cog: "Moderation"):
+        self.cog = cog
+
+    def check(self, ctx):
+        found = self.cog.find_bad_word(ctx.message.guild.id, ctx.config, ctx.content)
+        return Verdict("Yasaklı Kelime / Küfür", found) if found else None
+
+
+class RegexRule(Rule):
+    """The guild's own regex patterns, checked against the raw message text."""
+    name = "regex"
+    cost = 7
+    inputs = ("message",)
+
+    def __init__(self, cog: "Moderation"):
+        self.cog = cog
+
+    def enabled(self, config):
+        return bool(config.get("regex_rules"))
+
+    async def check(self, ctx):
+        guild = ctx.message.guild
+        found, exhausted = await self.cog.get_patterns(guild.id, ctx.config).search(self.cog.pattern_worker, ctx.message.content)
+        for pattern, elapsed in exhausted:
+            self.cog.actions.submit(guild.id, ("regex", pattern), lambda pattern=pattern, elapsed=elapsed: self.cog.disable_regex(guild, pattern, elapsed))
+        if not found:
+            return None
+        pattern, matched = found
+        return Verdict("Özel Kural (Regex)", f"{matched[:100]} • {pattern}")
+
+
+class RaidRule(Rule):
+    """The same text from many accounts in one channel."""
+    name = "raid"
+    cost = 8
+    inputs = ("message", "author", "content")
+    edits = False
+
+    def __init__(self, detector: RaidDetector):
+        self.detector = detector
+
+    def enabled(self, config):
+        return config.get("raid_protection", False)
+
+    def check(self, ctx):
+        message = ctx.message
+        raid = self.detector.check(
+            message.channel.id, message.author.id, message.id, ctx.content.squeezed,
+            max(2, ctx.config.get("raid_users", 4)), ctx.config.get("raid_window", 30)
+        )
+        if not raid:
+            return None
+        return Verdict(
+            "Baskın / Toplu Spam",
+            messages=[(message.channel.id, message_id) for _, message_id in raid],
+            users={user_id for user_id, _ in raid}
+        )
+
+
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Simple spam cache: {user_id: [timestamp, timestamp, ...]}
-        self.spam_cache = {} 
-        self.SPAM_THRESHOLD = 5  # messages
-        self.SPAM_WINDOW = 5     # seconds
+        # Sliding message windows per (guild, user); thresholds come from each guild's config
+        self.spam_tracker = SpamTracker()
+        # Recent message fingerprints per channel, for copy-paste raids across accounts
+        self.raid_detector = RaidDetector()
+        # Punishments run on bounded per-guild queues instead of inside on_message
+        self.actions = ActionExecutor()
+        # Log embeds are sent 10 per message, or as a digest under heavy load
+        self.mod_log = ModLogBatcher()
+        # {guild_id: ids of the roles that make members immune}, dropped on role/config changes
+        self.immunity = {}
+        # Content hashes of recently scanned messages, so edits that keep the text are skipped
+        self.scanned = ContentHashes()
+        # Per-guild whitelist tries, rebuilt when whitelist_links changes
+        self.link_whitelists = {}
+        # Compiled regex rules per guild, rebuilt when regex_rules changes
+        self.guild_patterns = {}
+        # Searches them in a child process that is killed when a pattern overruns
+        self.pattern_worker = PatternWorker()
+        # Optional phishing domain list, built with `python -m utils.links`
+        self.blocklist = Blocklist.load("utils/blocklist.bin")
         
         # Load Global Bad Words
         self.global_bad_words = []
@@ -26,21 +204,131 @@ class Moderation(commands.Cog):
                         self.global_bad_words.extend(lang_list)
         except Exception as e:
             print(f"Failed to load global bad words: {e}")
-            
-        # Start cleanup task
-        self.cleanup_spam_cache.start()
+
+        # The global list is compiled once and shared; each guild gets an automaton for its
+        # own words only, rebuilt when that list changes
+        self.global_matcher = TermMatcher(self.global_bad_words)
+        self.guild_matchers = {}
+
+        # Checks run cheapest-first and stop at the first verdict; other cogs can
+        # register extra rules on self.rules
+        self.rules = RuleEngine([
+            SpamRule(self.spam_tracker),
+            InviteRule(),
+            LinkRule(self),
+            FloodRule(),
+            BadWordRule(self),
+            RegexRule(self),
+            RaidRule(self.raid_detector)
+        ])
+        if self.blocklist:
+            self.rules.register(PhishingRule(self.blocklist))
+        db.subscribe(self.on_config_change, "moderation")
         
-    def cog_unload(self):
-        self.cleanup_spam_cache.cancel()
+    async def cog_unload(self):
+        db.unsubscribe(self.on_config_change)
+        await self.actions.close()
+        await self.mod_log.close()
+        await self.pattern_worker.close()
+        if self.blocklist:
+            self.blocklist.close()
+
+    def on_config_change(self, change: ConfigChange):
+        if change.key in (None, "bad_words"):
+            self.guild_matchers.pop(change.guild_id, None)
+        if change.key in (None, "whitelist_links"):
+            self.link_whitelists.pop(change.guild_id, None)
+        if change.key in (None, "regex_rules"):
+            self.guild_patterns.pop(change.guild_id, None)
+        if change.key in (None, "scan_admins"):
+            self.immunity.pop(int(change.guild_id), None)
+
+    def get_link_whitelist(self, guild_id: int, mod_config) -> DomainTrie:
+        key = str(guild_id)
+        whitelist = self.link_whitelists.get(key)
+        if whitelist is None:
+            whitelist = self.link_whitelists[key] = DomainTrie(mod_config.get("whitelist_links", []))
+        return whitelist
+
+    def get_patterns(self, guild_id: int, mod_config) -> PatternSet:
+        key = str(guild_id)
+        patterns = self.guild_patterns.get(key)
+        if patterns is None:
+            patterns = self.guild_patterns[key] = PatternSet(key, mod_config.get("regex_rules", []))
+        return patterns
+
+    async def disable_regex(self, guild, pattern: str, elapsed: float):
+        """Turns off a regex rule that kept exceeding its time budget and reports it."""
+        async with db.transaction(guild.id) as config:
+            for rule in config["moderation"]["regex_rules"]:
+                if rule["pattern"] == pattern:
+                    rule["enabled"] = False
+
+        await self.log_notice(
+            guild, "Regex Kuralı Devre Dışı",
+            f"`{pattern}` deseni süre sınırını tekrar tekrar aştığı için kapatıldı (son: {elapsed * 1000:.0f} ms).\n"
+            "Deseni sadeleştirip `mod regex add` ile tekrar ekleyebilirsiniz."
+        )
+
+    async def is_immune(self, member: discord.Member, mod_config) -> bool:
+        """Whether the member bypasses automod.
+
+        Only the guild's immune role ids are cached (one set per guild, not one entry per
+        member), so a member without such a role costs a few set lookups."""
+        guild = member.guild
+        # Essential Bypass: Server Owner & Bot Developers are ALWAYS immune
+        if member.id == guild.owner_id or await self.bot.is_owner(member):
+            return True
+        roles = self.immunity.get(guild.id)
+        if roles is None:
+            # Admin Checking Logic: roles granting Administrator or Manage Server
+            roles = self.immunity[guild.id] = frozenset() if mod_config.get("scan_admins", False) else frozenset(
+                role.id for role in guild.roles if role.permissions.administrator or role.permissions.manage_guild
+            )
+        return bool(roles) and any(role.id in roles for role in member.roles)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.immunity.pop(role.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.permissions != after.permissions:
+            self.immunity.pop(after.guild.id, None)
 
-    @tasks.loop(minutes=5)
-    async def cleanup_spam_cache(self):
-        """Clears the spam cache periodically to prevent memory leaks."""
-        self.spam_cache.clear()
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.immunity.pop(role.guild.id, None)
+
+    def find_bad_word(self, guild_id: int, mod_config, content: NormalizedText) -> Optional[str]:
+        """Returns the first custom or global bad word found in the normalized message."""
+        key = str(guild_id)
+        matcher = self.guild_matchers.get(key)
+        if matcher is None:
+            matcher = self.guild_matchers[key] = TermMatcher(mod_config.get("bad_words", []))
+        return matcher.search(content) or self.global_matcher.search(content)
+
+    async def bulk_delete(self, guild, messages):
+        """Deletes (channel id, message id) pairs with one bulk request per channel."""
+        by_channel = {}
+        for channel_id, message_id in messages:
+            by_channel.setdefault(channel_id, []).append(discord.Object(id=message_id))
+
+        for channel_id, objects in by_channel.items():
+            channel = guild.get_channel_or_thread(channel_id)
+            if not channel:
+                continue
+            try:
+                # At most threshold + 1 (<= 51) recent messages, within the 100 / 14 day bulk limits
+                await channel.delete_messages(objects, reason="Spam / Flood")
+            except (discord.Forbidden, discord.NotFound):
+                pass
+            except discord.HTTPException as e:
+                print(f"Bulk delete failed in {channel_id}: {e}")
 
-    async def log_action(self, guild, action: str, user: discord.Member, moderator: discord.Member, reason: str = "Yok"):
-        """Sends a moderation log embed."""
-        config = await db.get_guild_config(guild.id)
+    async def log_action(self, guild, action: str, user: discord.Member, moderator: discord.Member, reason: str = "Yok", match: Optional[str] = None):
+        """Queues a moderation log embed for the guild's log channel."""
+        config = await db.read_guild_config(guild.id)
         log_channel_id = config["moderation"].get("log_channel")
         if not log_channel_id:
             return
@@ -53,13 +341,34 @@ class Moderation(commands.Cog):
         embed.add_field(name="Kullanıcı", value=f"{user} ({user.id})", inline=True)
         embed.add_field(name="Yetkili", value=f"{moderator} ({moderator.id})", inline=True)
         embed.add_field(name="Sebep", value=reason, inline=False)
+        if match:
+            embed.add_field(name="Eşleşme", value=f"||{match}||", inline=False)
         embed.set_thumbnail(url=user.display_avatar.url)
-        
-        await channel.send(embed=embed)
 
-    async def apply_punishment(self, message, reason):
+        summary = f"**{action}** • {user} ({user.id}) • {moderator} • {reason}"
+        if match:
+            summary += f" • ||{match}||"
+        self.mod_log.add(channel, embed, summary)
+
+    async def log_notice(self, guild, title: str, description: str):
+        """Queues a system notice (not tied to a member) for the guild's log channel."""
+        config = await db.read_guild_config(guild.id)
+        channel = guild.get_channel(config["moderation"].get("log_channel") or 0)
+        if not channel:
+            return
+        embed = PremiumEmbed(title=f"🛡️ {title}", description=description, color=discord.Color.orange())
+        self.mod_log.add(channel, embed, f"**{title}** • {description.splitlines()[0]}")
+
+    async def apply_punishment(self, message, reason, match: Optional[str] = None, author: Optional[discord.Member] = None):
+        """Queues automated punishment (to `author`, if given, instead of the message author).
+
+        Runs on the guild's action queue, so the message handler returns right away.
+        Repeated punishments for the same user within a few seconds are collapsed."""
+        author = author or message.author
+        self.actions.submit(message.guild.id, author.id, lambda: self.punish(message, reason, match, author))
+
+    async def punish(self, message, reason, match: Optional[str], author: discord.Member):
         """Applies automated punishments based on warn count."""
-        author = message.author
         guild = message.guild
         
         # Add Warn
@@ -69,133 +378,109 @@ class Moderation(commands.Cog):
         embed = PremiumEmbed(title="⚠️ Uyarı", description=f"{guild.name} sunucusunda uyarıldınız.", color=discord.Color.orange())
         embed.add_field(name="Sebep", value=reason)
         embed.add_field(name="Ceza Sırası", value=f"#{warn_count}")
-        
-        try:
-            await author.send(embed=embed)
-        except:
-            pass # DM kapalı olabilir
-
-        action_taken = "Uyarı Verildi"
-
-        # 2. Timeout (15 mins) -> 2nd Offense
-        if warn_count == 2:
-            duration = datetime.timedelta(minutes=15)
-            try:
-                await author.timeout(duration, reason=reason)
-                action_taken = "15 Dakika Susturma"
-            except discord.Forbidden:
-                action_taken = "Susturma (Yetki Yok)"
 
-        # 3. Kick -> 3rd Offense
-        elif warn_count >= 3:
+        async def notify():
             try:
-                await author.kick(reason=f"Otomatik Ceza: {reason} (3+ Uyarı)")
-                action_taken = "Sunucudan Atıldı"
-            except discord.Forbidden:
-                action_taken = "Atma (Yetki Yok)"
+                await author.send(embed=embed)
+            except:
+                pass # DM kapalı olabilir
+
+        async def escalate():
+            # 2. Timeout (15 mins) -> 2nd Offense
+            if warn_count == 2:
+                duration = datetime.timedelta(minutes=15)
+                try:
+                    await author.timeout(duration, reason=reason)
+                    return "15 Dakika Susturma"
+                except discord.Forbidden:
+                    return "Susturma (Yetki Yok)"
+
+            # 3. Kick -> 3rd Offense
+            elif warn_count >= 3:
+                try:
+                    await author.kick(reason=f"Otomatik Ceza: {reason} (3+ Uyarı)")
+                    return "Sunucudan Atıldı"
+                except discord.Forbidden:
+                    return "Atma (Yetki Yok)"
+
+            return "Uyarı Verildi"
+
+        if warn_count >= 3:
+            # The DM has to go out while the user still shares the server with the bot
+            await notify()
+            action_taken = await escalate()
+        else:
+            _, action_taken = await asyncio.gather(notify(), escalate())
 
-        # Log to Server
-        await self.log_action(guild, action_taken, author, self.bot.user, reason)
-        
-        # Reply to user in channel
-        await message.channel.send(embed=PremiumEmbed.warning("İşlem Uygulandı", f"{author.mention} işlem uygulandı: **{action_taken}**\nSebep: {reason}"), delete_after=10)
+        # Log to Server and reply to user in channel, independently of each other
+        await asyncio.gather(
+            self.log_action(guild, action_taken, author, self.bot.user, reason, match),
+            message.channel.send(embed=PremiumEmbed.warning("İşlem Uygulandı", f"{author.mention} işlem uygulandı: **{action_taken}**\nSebep: {reason}"), delete_after=10),
+            return_exceptions=True
+        )
 
 
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author.bot or message.webhook_id or not message.guild:
             return
+        self.scanned.seen(message.id, message.content)
+        await self.scan(message)
 
-        config = await db.get_guild_config(message.guild.id)
+    @commands.Cog.listener()
+    async def on_message_edit(self, before, after):
+        await self.rescan(after)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        # Cached messages also fire on_message_edit
+        if payload.cached_message is None:
+            await self.rescan(payload.message)
+
+    async def rescan(self, message):
+        """Runs an edited message through the rules unless its text is unchanged (embed unfurls, pins ...)."""
+        if message.author.bot or message.webhook_id or not message.guild:
+            return
+        # Edits of members who already left arrive with a plain User
+        if not isinstance(message.author, discord.Member):
+            return
+        if self.scanned.seen(message.id, message.content):
+            return
+        await self.scan(message, edited=True)
+
+    async def scan(self, message, edited: bool = False):
+        config = await db.read_guild_config(message.guild.id)
         mod_config = config.get("moderation", {})
         
         if not mod_config.get("enabled", False):
             return
 
-        # Essential Bypass: Server Owner & Bot Developers are ALWAYS immune
-        if message.author.id == message.guild.owner_id or await self.bot.is_owner(message.author):
+        # Owner, bot developers and (unless scan_admins) admins are immune
+        if await self.is_immune(message.author, mod_config):
             return
 
-        # Admin Checking Logic
-        scan_admins = mod_config.get("scan_admins", False)
-        if not scan_admins:
-             if message.author.guild_permissions.administrator or message.author.guild_permissions.manage_guild:
-                 return
-
-        content_lower = message.content.lower()
-        content_stripped = "".join(content_lower.split()) # Remove spaces for bypass attempts like "k ü f ü r"
-
-        # 0. Repetitive Character Check (Spam/Flood)
-        if len(content_lower) > 10:
-             # Check if more than 50% of the message is the same character repeated
-             for char in set(content_stripped):
-                 if content_stripped.count(char) > len(content_stripped) * 0.6 and len(content_stripped) > 5:
-                     try:
-                         await message.delete()
-                         await self.apply_punishment(message, "Gereksiz Karakter Tekrarı (Spam)")
-                         return
-                     except:
-                         pass
-
-        # 1. Bad Words Filter
-        custom_bad_words = mod_config.get("bad_words", [])
-        all_bad_words = custom_bad_words + self.global_bad_words
-        
-        if any(word in content_lower for word in all_bad_words) or any(word in content_stripped for word in all_bad_words):
+        ctx = MessageContext(message, mod_config, edited)
+        result = await self.rules.evaluate(ctx)
+        if not result:
+            return
+        _, verdict = result
+
+        if verdict.messages:
+            # Spam / raid: remove every message of the window, not just the latest
+            await self.bulk_delete(message.guild, verdict.messages)
+        else:
             try:
                 await message.delete()
-                await self.apply_punishment(message, "Yasaklı Kelime / Küfür")
-            except:
+            except (discord.Forbidden, discord.NotFound):
                 pass
-            return
 
-        # 2. Link & Ad Protection
-        if mod_config.get("link_protection", False):
-            # Regex for generic links
-            url_pattern = re.compile(r'(https?://\S+|www\.\S+)')
-            # Specific Regex for Discord Invites (Ads)
-            invite_pattern = re.compile(r'(discord(?:app)?\.com/invite/|discord\.gg/)[a-zA-Z0-9]+')
-            
-            found_url = url_pattern.search(message.content)
-            found_invite = invite_pattern.search(message.content)
-            
-            if found_url or found_invite:
-                whitelist = mod_config.get("whitelist_links", [])
-                
-                # If it's an invite and no specific whitelist for it, block it as AD
-                if found_invite:
-                     # Check if it's the guild's own invite? (Optional, but safe to block all for now if strict)
-                     await message.delete()
-                     await self.apply_punishment(message, "Reklam (Discord Invite)")
-                     return
-
-                # Generic Link Check
-                if not any(allowed in message.content for allowed in whitelist):
-                    await message.delete()
-                    await self.apply_punishment(message, "Reklam / Yasaklı Link")
-                    return
-
-        # 3. Spam Protection
-        if mod_config.get("spam_protection", False):
-            now = datetime.datetime.now().timestamp()
-            user_id = message.author.id
-            
-            if user_id not in self.spam_cache:
-                self.spam_cache[user_id] = []
-            
-            # Add current msg timestamp
-            self.spam_cache[user_id].append(now)
-            
-            # Clean old timestamps
-            self.spam_cache[user_id] = [t for t in self.spam_cache[user_id] if now - t < self.SPAM_WINDOW]
-            
-            if len(self.spam_cache[user_id]) > self.SPAM_THRESHOLD:
-                # Spam detected
-                await message.delete() # Delete latest
-                # Ideally delete previous ones too but that requires history fetch
-                await self.apply_punishment(message, "Spam / Flood")
-                self.spam_cache[user_id] = [] # Reset to prevent loop kick
-                return
+        if verdict.users is None:
+            await self.apply_punishment(message, verdict.reason, verdict.match)
+            return
+        for user_id in verdict.users:
+            member = message.guild.get_member(user_id)
+            if member:
+                await self.apply_punishment(message, verdict.reason, verdict.match, author=member)
 
 
     # ------------------------------------------------------------------------ #
@@ -206,7 +491,7 @@ class Moderation(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def mod(self, ctx):
         if ctx.invoked_subcommand is None:
-            await ctx.send(embed=PremiumEmbed.warning("Eksik Komut", "Lütfen bir alt komut kullanın: `setup`, `badword`, `link`, `spam`, `test`"), delete_after=10)
+            await ctx.send(embed=PremiumEmbed.warning("Eksik Komut", "Lütfen bir alt komut kullanın: `setup`, `badword`, `regex`, `link`, `spam`, `rules`, `test`"), delete_after=10)
 
     @mod.command(name="test", description="Moderasyon sistemini test eder.")
     async def test_moderation(self, ctx):
@@ -222,6 +507,13 @@ class Moderation(commands.Cog):
         embed.add_field(name="Spam Koruması", value="✅ Aktif" if mod_config.get("spam_protection", False) else "❌ Deaktif", inline=True)
         embed.add_field(name="Link Koruması", value="✅ Aktif" if mod_config.get("link_protection", False) else "❌ Deaktif", inline=True)
         embed.add_field(name="Log Kanalı", value=f"<#{mod_config.get('log_channel')}>" if mod_config.get('log_channel') else "Ayarlanmamış", inline=True)
+
+        stats = self.actions.stats()
+        embed.add_field(
+            name="İşlem Kuyruğu",
+            value=f"{stats['queued']} bekleyen • {stats['running']} çalışan\np50 {stats['p50_ms']:.0f} ms • p99 {stats['p99_ms']:.0f} ms\n{stats['collapsed']} birleştirildi",
+            inline=False
+        )
         
         if self.global_bad_words:
             sample_words = ", ".join(self.global_bad_words[:5])
@@ -233,8 +525,7 @@ class Moderation(commands.Cog):
     @mod.command(name="setup", description="Log kanalını ve sistemi aktif eder.")
     @app_commands.describe(enabled="Modülü aç/kapat", channel="Logların gideceği kanal")
     async def setup(self, ctx, enabled: bool, channel: discord.TextChannel):
-        await db.update_guild_config(ctx.guild.id, "moderation", "enabled", enabled)
-        await db.update_guild_config(ctx.guild.id, "moderation", "log_channel", channel.id)
+        await db.update_guild_config_many(ctx.guild.id, "moderation", {"enabled": enabled, "log_channel": channel.id})
         
         status = "Aktif ✅" if enabled else "Deaktif ❌"
         await ctx.send(embed=PremiumEmbed.success("Kurulum Başarılı", f"Moderasyon sistemi **{status}**.\nLog kanalı: {channel.mention}"))
@@ -247,10 +538,9 @@ class Moderation(commands.Cog):
         app_commands.Choice(name="Listele", value="list")
     ])
     async def badword(self, ctx, action: str, word: Optional[str] = None):
-        config = await db.get_guild_config(ctx.guild.id)
-        current_words = config["moderation"].get("bad_words", [])
-
         if action == "list":
+            config = await db.read_guild_config(ctx.guild.id)
+            current_words = config["moderation"].get("bad_words", [])
             if not current_words:
                 await ctx.send(embed=PremiumEmbed.warning("Liste Boş", "Hiç özel yasaklı kelime yok."))
             else:
@@ -262,43 +552,149 @@ class Moderation(commands.Cog):
             return
 
         word = word.lower()
-        if action == "add":
-            if word not in current_words:
-                current_words.append(word)
-                await ctx.send(embed=PremiumEmbed.success("Eklendi", f"Yasaklı kelime eklendi: ||{word}||"))
-            else:
-                await ctx.send(embed=PremiumEmbed.warning("Mevcut", "Bu kelime zaten listede."))
-        
-        elif action == "remove":
-            if word in current_words:
-                current_words.remove(word)
-                await ctx.send(embed=PremiumEmbed.success("Kaldırıldı", f"Yasaklı kelime kaldırıldı: ||{word}||"))
+        async with db.transaction(ctx.guild.id) as config:
+            current_words = config["moderation"]["bad_words"]
+            if action == "add":
+                if word not in current_words:
+                    current_words.append(word)
+                    embed = PremiumEmbed.success("Eklendi", f"Yasaklı kelime eklendi: ||{word}||")
+                else:
+                    embed = PremiumEmbed.warning("Mevcut", "Bu kelime zaten listede.")
+            
+            elif action == "remove":
+                if word in current_words:
+                    current_words.remove(word)
+                    embed = PremiumEmbed.success("Kaldırıldı", f"Yasaklı kelime kaldırıldı: ||{word}||")
+                else:
+                    embed = PremiumEmbed.error("Bulunamadı", "Bu kelime listede yok.")
+
             else:
-                await ctx.send(embed=PremiumEmbed.error("Bulunamadı", "Bu kelime listede yok."))
+                return
         
-        await db.update_guild_config(ctx.guild.id, "moderation", "bad_words", current_words)
+        await ctx.send(embed=embed)
 
     @mod.command(name="spam", description="Spam korumasını aç/kapat.")
-    async def spam_toggle(self, ctx, enabled: bool):
-        await db.update_guild_config(ctx.guild.id, "moderation", "spam_protection", enabled)
+    @app_commands.describe(enabled="Aç/Kapat", threshold="Süre içinde izin verilen mesaj sayısı", window="Süre (saniye)")
+    async def spam_toggle(self, ctx, enabled: bool, threshold: Optional[app_commands.Range[int, 1, 50]] = None, window: Optional[app_commands.Range[int, 1, 60]] = None):
+        values = {"spam_protection": enabled}
+        if threshold is not None:
+            values["spam_threshold"] = threshold
+        if window is not None:
+            values["spam_window"] = window
+        await db.update_guild_config_many(ctx.guild.id, "moderation", values)
+
+        config = await db.read_guild_config(ctx.guild.id)
         state = "Açık" if enabled else "Kapalı"
         color = 0x2ecc71 if enabled else 0xe74c3c
-        await ctx.send(embed=PremiumEmbed(title="Spam Koruması", description=f"Durum: **{state}**", color=color))
+        limit = f"{config['moderation']['spam_threshold']} mesaj / {config['moderation']['spam_window']} sn"
+        await ctx.send(embed=PremiumEmbed(title="Spam Koruması", description=f"Durum: **{state}**\nSınır: **{limit}**", color=color))
 
     @mod.command(name="links", description="Link engelleyici ve Whitelist.")
     @app_commands.describe(enabled="Aç/Kapat", whitelist="Virgülle ayrılmış izinli domainler (örn: youtube.com,google.com)")
     async def links_toggle(self, ctx, enabled: bool, whitelist: Optional[str] = None):
-        await db.update_guild_config(ctx.guild.id, "moderation", "link_protection", enabled)
-        
+        values = {"link_protection": enabled}
         msg = f"Link Koruması: **{'Açık' if enabled else 'Kapalı'}**"
         
         if whitelist:
             allowed_list = [d.strip() for d in whitelist.split(",")]
-            await db.update_guild_config(ctx.guild.id, "moderation", "whitelist_links", allowed_list)
+            values["whitelist_links"] = allowed_list
             msg += f"\nWhitelist Güncellendi: {', '.join(allowed_list)}"
             
+        await db.update_guild_config_many(ctx.guild.id, "moderation", values)
         await ctx.send(embed=PremiumEmbed.success("Link Ayarı", msg))
 
+    @mod.group(name="regex", description="Özel regex kuralları.")
+    async def regex(self, ctx):
+        if ctx.invoked_subcommand is None:
+            await ctx.send(embed=PremiumEmbed.warning("Eksik Komut", "Lütfen bir alt komut kullanın: `add`, `remove`, `list`"), delete_after=10)
+
+    @regex.command(name="add", description="Regex kuralı ekler (veya kapatılmış olanı tekrar açar).")
+    @app_commands.describe(pattern="Regex deseni (büyük/küçük harf duyarsız)")
+    async def regex_add(self, ctx, *, pattern: str):
+        try:
+            compile_pattern(pattern)
+        except UnsafePattern as e:
+            await ctx.send(embed=PremiumEmbed.error("Geçersiz Desen", str(e)))
+            return
+
+        async with db.transaction(ctx.guild.id) as config:
+            rules = config["moderation"]["regex_rules"]
+            existing = next((rule for rule in rules if rule["pattern"] == pattern), None)
+            if existing:
+                if existing.get("enabled", True):
+                    embed = PremiumEmbed.warning("Mevcut", "Bu desen zaten listede.")
+                else:
+                    existing["enabled"] = True
+                    embed = PremiumEmbed.success("Tekrar Açıldı", f"Regex kuralı tekrar açıldı: `{pattern}`")
+            elif len(rules) >= MAX_PATTERNS:
+                embed = PremiumEmbed.error("Limit", f"En fazla {MAX_PATTERNS} regex kuralı eklenebilir.")
+            else:
+                rules.append({"pattern": pattern, "enabled": True})
+                embed = PremiumEmbed.success("Eklendi", f"Regex kuralı eklendi: `{pattern}`")
+
+        await ctx.send(embed=embed)
+
+    @regex.command(name="remove", description="Regex kuralını kaldırır.")
+    @app_commands.describe(pattern="Kaldırılacak desen")
+    async def regex_remove(self, ctx, *, pattern: str):
+        async with db.transaction(ctx.guild.id) as config:
+            rules = config["moderation"]["regex_rules"]
+            remaining = [rule for rule in rules if rule["pattern"] != pattern]
+            removed = len(remaining) != len(rules)
+            config["moderation"]["regex_rules"] = remaining
+
+        if removed:
+            await ctx.send(embed=PremiumEmbed.success("Kaldırıldı", f"Regex kuralı kaldırıldı: `{pattern}`"))
+        else:
+            await ctx.send(embed=PremiumEmbed.error("Bulunamadı", "Bu desen listede yok."))
+
+    @regex.command(name="list", description="Regex kurallarını listeler.")
+    async def regex_list(self, ctx):
+        config = await db.read_guild_config(ctx.guild.id)
+        rules = config["moderation"].get("regex_rules", [])
+        if not rules:
+            await ctx.send(embed=PremiumEmbed.warning("Liste Boş", "Hiç regex kuralı yok."))
+            return
+        lines = [f"{'✅' if rule.get('enabled', True) else '⏸️'} `{rule['pattern']}`" for rule in rules]
+        embed = PremiumEmbed(title="🧩 Regex Kuralları", description="\n".join(lines), color=0x9d4edd)
+        embed.set_footer(text="⏸️ = süre sınırını aştığı için kapatıldı")
+        await ctx.send(embed=embed)
+
+    @mod.command(name="rules", description="Otomatik moderasyon kurallarını ve sürelerini listeler.")
+    async def rules_list(self, ctx):
+        config = await db.read_guild_config(ctx.guild.id)
+        mod_config = config["moderation"]
+        custom = mod_config.get("custom_rules", [])
+
+        lines = []
+        for stats in self.rules.stats():
+            rule = self.rules.get(stats["name"])
+            active = stats["name"] in custom if stats["custom"] else rule.enabled(mod_config)
+            lines.append(
+                f"{'✅' if active else '❌'} **{stats['name']}**{' (özel)' if stats['custom'] else ''} • "
+                f"{stats['hits']}/{stats['runs']} eşleşme • p50 {stats['p50_us']:.0f} µs • p99 {stats['p99_us']:.0f} µs"
+            )
+        embed = PremiumEmbed(title="📋 Moderasyon Kuralları", description="\n".join(lines) or "Kural yok.", color=0x9d4edd)
+        embed.set_footer(text="Kurallar ucuzdan pahalıya çalışır, ilk eşleşmede durur.")
+        await ctx.send(embed=embed)
+
+    @mod.command(name="rule", description="Özel bir moderasyon kuralını aç/kapat.")
+    @app_commands.describe(name="Kural adı", enabled="Aç/Kapat")
+    async def rule_toggle(self, ctx, name: str, enabled: bool):
+        rule = self.rules.get(name)
+        if not rule or not rule.custom:
+            await ctx.send(embed=PremiumEmbed.error("Bulunamadı", "Bu isimde özel bir kural yok. `mod rules` ile listeleyin."))
+            return
+
+        async with db.transaction(ctx.guild.id) as config:
+            custom = config["moderation"]["custom_rules"]
+            if enabled and name not in custom:
+                custom.append(name)
+            elif not enabled and name in custom:
+                custom.remove(name)
+
+        await ctx.send(embed=PremiumEmbed.success("Kural Ayarı", f"**{name}**: **{'Açık' if enabled else 'Kapalı'}**"))
+
     # ------------------------------------------------------------------------ #
     #                             MANUAL ACTIONS                               #
     # ------------------------------------------------------------------------ #
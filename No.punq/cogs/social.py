@@ -3,43 +3,71 @@ from discord.ext import commands, tasks
 from discord import app_commands
 from utils.database import db
 import aiohttp
+import asyncio
+import time
 import xml.etree.ElementTree as ET
 import logging
 from typing import Optional
+from urllib.parse import urlsplit
 import json
 
+# Polling limits: requests in flight overall and per host (YouTube, Kick and TikTok each
+# get their own share), and how long a single request may take end to end
+MAX_IN_FLIGHT = 24
+PER_HOST = 8
+REQUEST_TIMEOUT = 15
+
 class Social(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.check_updates.start()
         self.logger = logging.getLogger("Social")
         self.session = None
+        self.slots = None
+        self.host_slots = {}
 
     async def cog_load(self):
-        self.session = aiohttp.ClientSession(headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        })
+        self.slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self.session = aiohttp.ClientSession(
+            headers={
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+            },
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=5),
+            connector=aiohttp.TCPConnector(limit=MAX_IN_FLIGHT, limit_per_host=PER_HOST, ttl_dns_cache=300)
+        )
 
     async def cog_unload(self):
         self.check_updates.cancel()
         if self.session:
             await self.session.close()
 
-    async def check_youtube(self, channel_id):
-        url = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
-        try:
+    async def fetch(self, url: str, as_json: bool = False):
+        """GETs a URL under the per-host and global limits. Returns the body, or None unless the status is 200."""
+        host = urlsplit(url).hostname
+        host_slots = self.host_slots.get(host)
+        if host_slots is None:
+            host_slots = self.host_slots[host] = asyncio.Semaphore(PER_HOST)
+        # Host first, so requests queued behind a slow host do not hold global slots
+        async with host_slots, self.slots:
             async with self.session.get(url) as response:
                 if response.status != 200:
                     return None
-                data = await response.text()
-                root = ET.fromstring(data)
-                ns = {'atom': 'http://www.w3.org/2005/Atom', 'yt': 'http://www.youtube.com/xml/schemas/2015'}
-                entry = root.find('atom:entry', ns)
-                if entry is not None:
-                    video_id = entry.find('yt:videoId', ns).text
-                    link = entry.find('atom:link', ns).attrib['href']
-                    title = entry.find('atom:title', ns).text
-                    return {"id": video_id, "link": link, "title": title, "type": "video"}
+                return await response.json() if as_json else await response.text()
+
+    async def check_youtube(self, channel_id):
+        url = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
+        try:
+            data = await self.fetch(url)
+            if data is None:
+                return None
+            root = ET.fromstring(data)
+            ns = {'atom': 'http://www.w3.org/2005/Atom', 'yt': 'http://www.youtube.com/xml/schemas/2015'}
+            entry = root.find('atom:entry', ns)
+            if entry is not None:
+                video_id = entry.find('yt:videoId', ns).text
+                link = entry.find('atom:link', ns).attrib['href']
+                title = entry.find('atom:title', ns).text
+                return {"id": video_id, "link": link, "title": title, "type": "video"}
         except Exception as e:
             self.logger.error(f"Error fetching YT {channel_id}: {e}")
         return None
@@ -47,19 +75,18 @@ class Social(commands.Cog):
     async def check_kick(self, channel_slug):
         url = f"https://kick.com/api/v1/channels/{channel_slug}"
         try:
-            async with self.session.get(url) as response:
-                if response.status != 200:
-                    return None
-                data = await response.json()
-                livestream = data.get("livestream")
-                if livestream:
-                    return {
-                        "id": str(livestream["id"]),
-                        "title": livestream["session_title"],
-                        "link": f"https://kick.com/{channel_slug}",
-                        "thumbnail": livestream["thumbnail"]["url"],
-                        "type": "live"
-                    }
+            data = await self.fetch(url, as_json=True)
+            if data is None:
+                return None
+            livestream = data.get("livestream")
+            if livestream:
+                return {
+                    "id": str(livestream["id"]),
+                    "title": livestream["session_title"],
+                    "link": f"https://kick.com/{channel_slug}",
+                    "thumbnail": livestream["thumbnail"]["url"],
+                    "type": "live"
+                }
         except Exception as e:
             self.logger.error(f"Error fetching Kick {channel_slug}: {e}")
         return None
@@ -68,26 +95,25 @@ class Social(commands.Cog):
         # Best effort scraping for TikTok Live
         url = f"https://www.tiktok.com/@{username}/live"
         try:
-            async with self.session.get(url) as response:
-                if response.status != 200:
-                    return None
-                html = await response.text()
-                # Check for indicators of live stream
-                # Verify specific meta tags or room_id presence which usually indicates live session
-                if '"status":2' in html or "room_id" in html and '"status":4' not in html: # Simplified guess
-                    # TikTok structure changes often, this is fragile.
-                    # Alternative: checking for og:title containing "LIVE"
-                    # For now, let's assume if we can fetch the live page and it has certain data, they might be live.
-                    # A robust way needs a headless browser or heavy reversing.
-                    # We will use a simple heuristic: if "room_id" is present and we are redirected to /live, good chance.
-                    
-                    if "room_id" in html:
-                         return {
-                            "id": "live", # Dynamic ID is hard to extract reliably without regex
-                            "link": f"https://www.tiktok.com/@{username}/live",
-                            "title": f"{username} TikTok'ta Canlı Yayında!",
-                            "type": "live"
-                        }
+            html = await self.fetch(url)
+            if html is None:
+                return None
+            # Check for indicators of live stream
+            # Verify specific meta tags or room_id presence which usually indicates live session
+            if '"status":2' in html or "room_id" in html and '"status":4' not in html: # Simplified guess
+                # TikTok structure changes often, this is fragile.
+                # Alternative: checking for og:title containing "LIVE"
+                # For now, let's assume if we can fetch the live page and it has certain data, they might be live.
+                # A robust way needs a headless browser or heavy reversing.
+                # We will use a simple heuristic: if "room_id" is present and we are redirected to /live, good chance.
+                
+                if "room_id" in html:
+                     return {
+                        "id": "live", # Dynamic ID is hard to extract reliably without regex
+                        "link": f"https://www.tiktok.com/@{username}/live",
+                        "title": f"{username} TikTok'ta Canlı Yayında!",
+                        "type": "live"
+                    }
         except Exception as e:
             self.logger.error(f"Error fetching TikTok {username}: {e}")
         return None
@@ -97,8 +123,11 @@ class Social(commands.Cog):
         await self.bot.wait_until_ready()
         
         try:
-            all_data = await db.get_all()
-            for guild_id_str, config in all_data.items():
+            started = time.monotonic()
+            checks = {"youtube": self.check_youtube, "kick": self.check_kick, "tiktok": self.check_tiktok}
+            targets = {}
+            accounts = set()
+            for guild_id_str, config in (await db.get_all()).items():
                 if "social" not in config:
                     continue
                 
@@ -112,47 +141,62 @@ class Social(commands.Cog):
                 channel = guild.get_channel(notify_channel_id)
                 if not channel: continue
 
-                # Check YouTube
-                for yt in social_config.get("youtube", []):
-                    latest = await self.check_youtube(yt["id"])
-                    if latest and latest["id"] != yt.get("last_video"):
-                        await channel.send(f"@everyone 📢 **Yeni YouTube Videosu!**\n**{yt['name']}** yeni bir video yükledi:\n{latest['link']}")
-                        yt["last_video"] = latest["id"]
-                        await db.update_guild_config(int(guild_id_str), "social", "youtube", social_config["youtube"])
-
-                # Check Kick
-                for kick in social_config.get("kick", []):
-                    latest = await self.check_kick(kick["id"]) # id is slug here
-                    if latest:
-                        # Check if we already notified for this stream
-                        if latest["id"] != kick.get("last_stream"):
-                            await channel.send(f"@everyone 🔴 **KICK CANLI YAYIN!**\n**{kick['name']}** yayında!\n{latest['title']}\n{latest['link']}")
-                            kick["last_stream"] = latest["id"]
-                            await db.update_guild_config(int(guild_id_str), "social", "kick", social_config["kick"])
-
-                # Check TikTok
-                for tiktok in social_config.get("tiktok", []):
-                    latest = await self.check_tiktok(tiktok["id"])
-                    # Simple state tracking for generic "live" status to avoid spam
-                    # Since we don't get a unique stream ID easily from regex, we toggle a boolean or ignore 'id' logic if it is always 'live'
-                    # We will just use 'live' as ID and check if we have already notified 'live' recently?
-                    # Better: If latest found (Online) and last_stream != "online", notify.
-                    # If not found (Offline), set last_stream = "offline".
-                    
-                    is_live = latest is not None
-                    last_status = tiktok.get("last_stream", "offline")
-                    
-                    if is_live and last_status != "online":
-                        await channel.send(f"@everyone 🔴 **TIKTOK CANLI YAYIN!**\n**{tiktok['name']}** yayında!\n{latest['link']}")
-                        tiktok["last_stream"] = "online"
-                        await db.update_guild_config(int(guild_id_str), "social", "tiktok", social_config["tiktok"])
-                    elif not is_live and last_status == "online":
-                        tiktok["last_stream"] = "offline"
-                        await db.update_guild_config(int(guild_id_str), "social", "tiktok", social_config["tiktok"])
+                targets[guild.id] = channel
+                for platform in checks:
+                    accounts.update((platform, account["id"]) for account in social_config.get(platform, []))
+
+            # Every account is fetched once per cycle, however many guilds follow it, and all
+            # of them concurrently within the host / global limits of fetch()
+            accounts = list(accounts)
+            results = await asyncio.gather(*(checks[platform](account_id) for platform, account_id in accounts))
+            latest = dict(zip(accounts, results))
+
+            await asyncio.gather(
+                *(self.notify_guild(guild_id, channel, latest) for guild_id, channel in targets.items()),
+                return_exceptions=True
+            )
+            self.logger.debug(f"Polled {len(accounts)} accounts for {len(targets)} guilds in {time.monotonic() - started:.1f}s")
 
         except Exception as e:
             self.logger.error(f"Error in social update loop: {e}")
 
+    async def notify_guild(self, guild_id: int, channel, latest):
+        """Records new videos / streams of one guild in a single write, then announces them."""
+        announcements = []
+        async with db.transaction(guild_id) as config:
+            social_config = config["social"]
+
+            # Check YouTube
+            for yt in social_config.get("youtube", []):
+                video = latest.get(("youtube", yt["id"]))
+                if video and video["id"] != yt.get("last_video"):
+                    announcements.append(f"@everyone 📢 **Yeni YouTube Videosu!**\n**{yt['name']}** yeni bir video yükledi:\n{video['link']}")
+                    yt["last_video"] = video["id"]
+
+            # Check Kick (id is the channel slug)
+            for kick in social_config.get("kick", []):
+                stream = latest.get(("kick", kick["id"]))
+                # Check if we already notified for this stream
+                if stream and stream["id"] != kick.get("last_stream"):
+                    announcements.append(f"@everyone 🔴 **KICK CANLI YAYIN!**\n**{kick['name']}** yayında!\n{stream['title']}\n{stream['link']}")
+                    kick["last_stream"] = stream["id"]
+
+            # Check TikTok: no stable stream id, so only online/offline transitions are tracked
+            for tiktok in social_config.get("tiktok", []):
+                stream = latest.get(("tiktok", tiktok["id"]))
+                last_status = tiktok.get("last_stream", "offline")
+                if stream and last_status != "online":
+                    announcements.append(f"@everyone 🔴 **TIKTOK CANLI YAYIN!**\n**{tiktok['name']}** yayında!\n{stream['link']}")
+                    tiktok["last_stream"] = "online"
+                elif not stream and last_status == "online":
+                    tiktok["last_stream"] = "offline"
+
+        for text in announcements:
+            try:
+                await channel.send(text)
+            except discord.HTTPException as e:
+                self.logger.error(f"Error announcing in guild {guild_id}: {e}")
+
     @commands.hybrid_group(name="social", description="Sosyal medya takip sistemi.")
     @commands.has_permissions(administrator=True)
     async def social(self, ctx):
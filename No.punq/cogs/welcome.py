@@ -8,7 +8,7 @@ class Welcome(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        config = await db.get_guild_config(member.guild.id)
+        config = await db.read_guild_config(member.guild.id)
         welcome_cfg = config.get("welcome", {})
         
         if not welcome_cfg.get("enabled", False):
@@ -64,7 +64,7 @@ class Welcome(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
-        config = await db.get_guild_config(member.guild.id)
+        config = await db.read_guild_config(member.guild.id)
         welcome_cfg = config.get("welcome", {})
         
         if not welcome_cfg.get("leave_enabled", False):
@@ -8,6 +8,7 @@ from discord.ext import commands
 from fastapi import FastAPI
 from uvicorn import Config, Server
 from utils.database import db
+from utils.patterns import MAX_PATTERNS, UnsafePattern, compile_pattern
 from utils.ui import PremiumEmbed
 
 # ---------------------------------------------------------------------------- #
@@ -41,6 +42,7 @@ def load_config():
     if os.environ.get("CLIENT_SECRET"): config["client_secret"] = os.environ.get("CLIENT_SECRET")
     if os.environ.get("REDIRECT_URI"): config["redirect_uri"] = os.environ.get("REDIRECT_URI")
     if os.environ.get("OWNER_ID"): config["owner_id"] = os.environ.get("OWNER_ID")
+    if os.environ.get("DATABASE_STORAGE"): config["database_storage"] = os.environ.get("DATABASE_STORAGE")
     
     return config
 
@@ -224,21 +226,77 @@ async def update_moderation(request: Request, guild_id: str):
     link_protection = form.get("link_protection") == "on"
     spam_protection = form.get("spam_protection") == "on"
     scan_admins = form.get("scan_admins") == "on"
+    raid_protection = form.get("raid_protection") == "on"
+    warn_decay_days = form.get("warn_decay_days")
+    spam_limits = {
+        "spam_threshold": (form.get("spam_threshold"), 5, 1, 50),
+        "spam_window": (form.get("spam_window"), 5, 1, 60),
+        # A one-user "raid" would flag every longer message
+        "raid_users": (form.get("raid_users"), 4, 2, 50),
+        "raid_window": (form.get("raid_window"), 30, 1, 300)
+    }
+    flood_limits = {
+        "flood_char_percent": (form.get("flood_char_percent"), 60),
+        "flood_repeat_percent": (form.get("flood_repeat_percent"), 30),
+        "flood_max_emojis": (form.get("flood_max_emojis"), 15),
+        "flood_max_mentions": (form.get("flood_max_mentions"), 5)
+    }
     
     # Process inputs
     try:
         log_channel_id = int(log_channel) if log_channel and log_channel.strip() else None
     except ValueError:
         log_channel_id = None
+
+    try:
+        warn_decay_days = max(0, int(warn_decay_days)) if warn_decay_days else 30
+    except ValueError:
+        warn_decay_days = 30
+
+    # 0 disables a flood check, percentages are capped at 100
+    for key, (raw, default) in flood_limits.items():
+        try:
+            value = max(0, int(raw)) if raw else default
+        except ValueError:
+            value = default
+        flood_limits[key] = min(value, 100) if key.endswith("_percent") else value
+
+    for key, (raw, default, minimum, maximum) in spam_limits.items():
+        try:
+            value = int(raw) if raw else default
+        except ValueError:
+            value = default
+        spam_limits[key] = min(max(minimum, value), maximum)
         
     bad_words = [w.strip() for w in bad_words_str.split(",") if w.strip()]
-    
-    await db.update_guild_config(int(guild_id), "moderation", "enabled", enabled)
-    await db.update_guild_config(int(guild_id), "moderation", "log_channel", log_channel_id)
-    await db.update_guild_config(int(guild_id), "moderation", "bad_words", bad_words)
-    await db.update_guild_config(int(guild_id), "moderation", "link_protection", link_protection)
-    await db.update_guild_config(int(guild_id), "moderation", "spam_protection", spam_protection)
-    await db.update_guild_config(int(guild_id), "moderation", "scan_admins", scan_admins)
+
+    # One pattern per line; unsafe or invalid ones are dropped, rules disabled for
+    # exceeding their time budget stay disabled until re-added with `mod regex add`
+    config = await db.read_guild_config(int(guild_id))
+    previous = {rule["pattern"]: rule.get("enabled", True) for rule in config["moderation"].get("regex_rules", [])}
+    regex_rules = []
+    for pattern in dict.fromkeys(line.strip() for line in form.get("regex_rules", "").splitlines()):
+        if not pattern or len(regex_rules) >= MAX_PATTERNS:
+            continue
+        try:
+            compile_pattern(pattern)
+        except UnsafePattern:
+            continue
+        regex_rules.append({"pattern": pattern, "enabled": previous.get(pattern, True)})
+    
+    await db.update_guild_config_many(int(guild_id), "moderation", {
+        "enabled": enabled,
+        "log_channel": log_channel_id,
+        "bad_words": bad_words,
+        "regex_rules": regex_rules,
+        "link_protection": link_protection,
+        "spam_protection": spam_protection,
+        "scan_admins": scan_admins,
+        "raid_protection": raid_protection,
+        "warn_decay_days": warn_decay_days,
+        **flood_limits,
+        **spam_limits
+    })
     
     return RedirectResponse(f"/dashboard/{guild_id}", status_code=303)
 
@@ -272,15 +330,18 @@ async def update_welcome(request: Request, guild_id: str):
         try: member_target = int(member_target_str)
         except ValueError: pass
             
-    await db.update_guild_config(int(guild_id), "welcome", "enabled", enabled)
-    await db.update_guild_config(int(guild_id), "welcome", "leave_enabled", leave_enabled)
-    await db.update_guild_config(int(guild_id), "welcome", "channel_id", channel_id)
-    await db.update_guild_config(int(guild_id), "welcome", "rules_channel_id", rules_channel_id)
-    await db.update_guild_config(int(guild_id), "welcome", "member_target", member_target)
+    values = {
+        "enabled": enabled,
+        "leave_enabled": leave_enabled,
+        "channel_id": channel_id,
+        "rules_channel_id": rules_channel_id,
+        "member_target": member_target
+    }
     if message:
-        await db.update_guild_config(int(guild_id), "welcome", "message", message)
+        values["message"] = message
     if leave_message:
-        await db.update_guild_config(int(guild_id), "welcome", "leave_message", leave_message)
+        values["leave_message"] = leave_message
+    await db.update_guild_config_many(int(guild_id), "welcome", values)
     
     return RedirectResponse(f"/dashboard/{guild_id}", status_code=303)
 
@@ -298,8 +359,7 @@ async def update_autorole(request: Request, guild_id: str):
         try: role_id = int(role_id_str.strip())
         except ValueError: pass
             
-    await db.update_guild_config(int(guild_id), "auto_role", "enabled", enabled)
-    await db.update_guild_config(int(guild_id), "auto_role", "role_id", role_id)
+    await db.update_guild_config_many(int(guild_id), "auto_role", {"enabled": enabled, "role_id": role_id})
     
     return RedirectResponse(f"/dashboard/{guild_id}", status_code=303)
 
@@ -317,8 +377,7 @@ async def update_feature(request: Request, guild_id: str):
         try: channel_id = int(channel_id_str.strip())
         except ValueError: pass
             
-    await db.update_guild_config(int(guild_id), "feature_channel", "enabled", enabled)
-    await db.update_guild_config(int(guild_id), "feature_channel", "channel_id", channel_id)
+    await db.update_guild_config_many(int(guild_id), "feature_channel", {"enabled": enabled, "channel_id": channel_id})
     
     # Trigger message update in bot
     bot.dispatch("feature_channel_update", int(guild_id))
@@ -333,50 +392,45 @@ async def update_greeting(request: Request, guild_id: str):
     form = await request.form()
     guild_id_int = int(guild_id)
     
-    # Get current config to preserve existing times if not provided
-    current_config = await db.get_guild_config(guild_id_int)
-    greeting = current_config.get("greeting", {})
-    
-    # Update fields
-    greeting["enabled"] = form.get("enabled") == "on"
-    
-    channel_id_str = form.get("channel_id")
-    if channel_id_str and channel_id_str.strip():
-        try: greeting["channel_id"] = int(channel_id_str.strip())
-        except ValueError: pass
-    else:
-        greeting["channel_id"] = None
+    # Existing times are preserved if not provided; the whole block is saved at once
+    async with db.transaction(guild_id_int) as current_config:
+        greeting = current_config["greeting"]
         
-    morning_msg = form.get("morning_msg")
-    if morning_msg: greeting["morning_msg"] = morning_msg
-    
-    evening_msg = form.get("evening_msg")
-    if evening_msg: greeting["evening_msg"] = evening_msg
-    
-    # Handle Times robustly
-    try:
-        m_hour = form.get("morning_hour")
-        if m_hour is not None and m_hour.strip() != "":
-            greeting["morning_hour"] = int(m_hour)
-            
-        m_min = form.get("morning_minute")
-        if m_min is not None and m_min.strip() != "":
-            greeting["morning_minute"] = int(m_min)
-            
-        e_hour = form.get("evening_hour")
-        if e_hour is not None and e_hour.strip() != "":
-            greeting["evening_hour"] = int(e_hour)
+        # Update fields
+        greeting["enabled"] = form.get("enabled") == "on"
+        
+        channel_id_str = form.get("channel_id")
+        if channel_id_str and channel_id_str.strip():
+            try: greeting["channel_id"] = int(channel_id_str.strip())
+            except ValueError: pass
+        else:
+            greeting["channel_id"] = None
             
-        e_min = form.get("evening_minute")
-        if e_min is not None and e_min.strip() != "":
-            greeting["evening_minute"] = int(e_min)
-    except (ValueError, TypeError):
-        pass
-    
-    # Save the entire greeting dict at once
-    full_config = await db.get_guild_config(guild_id_int)
-    full_config["greeting"] = greeting
-    await db.set(str(guild_id_int), full_config)
+        morning_msg = form.get("morning_msg")
+        if morning_msg: greeting["morning_msg"] = morning_msg
+        
+        evening_msg = form.get("evening_msg")
+        if evening_msg: greeting["evening_msg"] = evening_msg
+        
+        # Handle Times robustly
+        try:
+            m_hour = form.get("morning_hour")
+            if m_hour is not None and m_hour.strip() != "":
+                greeting["morning_hour"] = int(m_hour)
+                
+            m_min = form.get("morning_minute")
+            if m_min is not None and m_min.strip() != "":
+                greeting["morning_minute"] = int(m_min)
+                
+            e_hour = form.get("evening_hour")
+            if e_hour is not None and e_hour.strip() != "":
+                greeting["evening_hour"] = int(e_hour)
+                
+            e_min = form.get("evening_minute")
+            if e_min is not None and e_min.strip() != "":
+                greeting["evening_minute"] = int(e_min)
+        except (ValueError, TypeError):
+            pass
     
     return RedirectResponse(f"/dashboard/{guild_id}", status_code=303)
 
@@ -437,14 +491,12 @@ async def add_social_account(request: Request, guild_id: str):
         entry["name"] = entry["id"]
 
     # Load current config
-    config = await db.get_guild_config(int(guild_id))
-    social_config = config.get("social", {})
-    current_list = social_config.get(platform, [])
-    
-    # Check duplicate
-    if not any(c["id"] == entry["id"] for c in current_list):
-        current_list.append(entry)
-        await db.update_guild_config(int(guild_id), "social", platform, current_list)
+    async with db.transaction(int(guild_id)) as config:
+        current_list = config["social"].setdefault(platform, [])
+        
+        # Check duplicate
+        if not any(c["id"] == entry["id"] for c in current_list):
+            current_list.append(entry)
 
     return RedirectResponse(f"/dashboard/{guild_id}", status_code=303)
 
@@ -458,13 +510,10 @@ async def remove_social_account(request: Request, guild_id: str):
     account_id = form.get("account_id")
 
     if platform and account_id:
-        config = await db.get_guild_config(int(guild_id))
-        social_config = config.get("social", {})
-        current_list = social_config.get(platform, [])
-
-        new_list = [c for c in current_list if c["id"] != account_id]
-        
-        await db.update_guild_config(int(guild_id), "social", platform, new_list)
+        async with db.transaction(int(guild_id)) as config:
+            social_config = config["social"]
+            current_list = social_config.get(platform, [])
+            social_config[platform] = [c for c in current_list if c["id"] != account_id]
 
     return RedirectResponse(f"/dashboard/{guild_id}", status_code=303)
 
@@ -483,9 +532,20 @@ class PunqBot(commands.Bot):
             help_command=None,
             case_insensitive=True
         )
+        # Parsed once, is_owner runs on every guild message through the moderation checks
+        self.config_owner_id = int(config["owner_id"]) if config.get("owner_id") else None
 
     async def setup_hook(self):
         # Initialize Database
+        db.configure(
+            db_path=config.get("database_path"),
+            flush_interval=config.get("database_flush_interval"),
+            flush_threshold=config.get("database_flush_threshold"),
+            storage=config.get("database_storage"),
+            journal_max_bytes=config.get("database_journal_max_bytes"),
+            warn_retention_days=config.get("database_warn_retention_days"),
+            shard_cache_size=config.get("database_shard_cache_size")
+        )
         await db.initialize()
         
         # Load Cogs
@@ -523,9 +583,14 @@ class PunqBot(commands.Bot):
                 logger.error(f"Failed to fetch app info: {e}")
 
 
+    async def close(self):
+        await super().close()
+        # Persist anything the write-behind flusher has not written yet
+        await db.close()
+
     # Bot Owner Check specifically for ID from config
     async def is_owner(self, user: discord.User):
-        if config.get("owner_id") and user.id == int(config["owner_id"]):
+        if user.id == self.config_owner_id:
             return True
         return await super().is_owner(user)
 
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from utils.matcher import TermMatcher
+from utils.normalize import normalize
+
+with open("utils/bad_words.json", "r", encoding="utf-8") as f:
+    GLOBAL_WORDS = [word for words in json.load(f).values() for word in words]
+
+matcher = TermMatcher(GLOBAL_WORDS)
+
+
+@pytest.mark.parametrize("text", [
+    "I got it",
+    "nice picture",
+    "epic game",
+    "the doctor is in",
+    "block the local process",
+    "Got a minute? That was EPIC",
+])
+def test_diacritic_terms_do_not_match_folded_words(text):
+    assert matcher.search(normalize(text)) is None
+
+
+@pytest.mark.parametrize("text, word", [
+    ("sen tam bir göt", "göt"),
+    ("SEN PİÇ", "piç"),
+    ("oç", "oç"),
+])
+def test_diacritic_terms_match_as_written(text, word):
+    assert matcher.search(normalize(text)) == word
+
+
+@pytest.mark.parametrize("text", [
+    "s a l a k",
+    "s4l4k",
+    "sa\u200blak",
+    "saaaalak",
+    "SALAK",
+])
+def test_plain_terms_match_obfuscated(text):
+    assert matcher.search(normalize(text)) == "salak"
+
+
+@pytest.mark.parametrize("text", [
+    "tamam kanal",
+    "tamam kanka geliyorum",
+])
+def test_stripped_matches_do_not_join_words(text):
+    assert matcher.search(normalize(text)) is None
+
+
+@pytest.mark.parametrize("text", [
+    "sa lak",
+    "tamam kanal s a l a k",
+    "saaa lakkk",
+])
+def test_stripped_matches_of_whole_words(text):
+    assert matcher.search(normalize(text)) == "salak"
+
+
+@pytest.mark.parametrize("text, word", [
+    ("yavsak", "yavsak"),
+    ("y a v ş a k", "yavsak"),
+    ("yavşşşak", "yavsak"),
+    ("gerizekali", "gerizekali"),
+    ("ger1zekalı", "gerizekali"),
+    ("GERİZEKALI", "gerizekali"),
+])
+def test_long_diacritic_terms_match_obfuscated(text, word):
+    assert matcher.search(normalize(text)) == word
+
+
+@pytest.mark.parametrize("text, word", [
+    ("p i ç", "piç"),
+    ("sen g ö t", "göt"),
+    ("p1ç", "piç"),
+    ("0ç lobby", "oç"),
+])
+def test_short_diacritic_terms_match_obfuscated(text, word):
+    assert matcher.search(normalize(text)) == word
+
+
+@pytest.mark.parametrize("text", [
+    "sip iç",
+    "bugün çok güzel",
+])
+def test_short_diacritic_terms_do_not_join_words(text):
+    assert matcher.search(normalize(text)) is None
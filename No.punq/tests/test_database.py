@@ -0,0 +1,107 @@
+import asyncio
+
+from utils.database import Database
+from utils.sqlite_store import migrate_json
+
+GUILDS = (1, 2, 3)
+
+
+async def _fill(path: str):
+    db = Database(str(path), flush_interval=0, storage="sharded")
+    await db.initialize()
+    for guild in GUILDS:
+        await db.update_guild_config(guild, "moderation", "enabled", True)
+    await db.close()
+
+
+def test_loading_a_shard_never_evicts_it(tmp_path):
+    path = tmp_path / "database.json"
+
+    async def run():
+        await _fill(path)
+        # Every other cached guild is unsaved when the last one is read in
+        db = Database(str(path), flush_interval=3600, storage="sharded", shard_cache_size=2)
+        await db.initialize()
+        for guild in GUILDS:
+            await db.update_guild_config(guild, "moderation", "log_channel", guild)
+        await db.close()
+
+        reloaded = Database(str(path), flush_interval=3600, storage="sharded")
+        await reloaded.load()
+        return [await reloaded.read_guild_config(guild) for guild in GUILDS]
+
+    for guild, config in zip(GUILDS, asyncio.run(run())):
+        assert config["moderation"]["enabled"] is True
+        assert config["moderation"]["log_channel"] == guild
+
+
+def test_concurrent_flushes_survive_compaction(tmp_path):
+    path = tmp_path / "database.json"
+
+    async def run():
+        # Every mutation flushes on its own and the journal is compacted every few records
+        db = Database(str(path), flush_interval=0, storage="journal", journal_max_bytes=512)
+        await db.initialize()
+        tasks = []
+        for guild in range(1, 201):
+            # Keep mutations arriving while earlier flushes and compactions are still running
+            tasks.append(asyncio.create_task(db.update_guild_config(guild, "moderation", "log_channel", guild)))
+            await asyncio.sleep(0.0002)
+        await asyncio.gather(*tasks)
+        await db.close()
+
+        reloaded = Database(str(path), flush_interval=0, storage="journal")
+        await reloaded.load()
+        return [(await reloaded.read_guild_config(guild))["moderation"]["log_channel"] for guild in range(1, 201)]
+
+    assert asyncio.run(run()) == list(range(1, 201))
+
+
+def test_failed_save_is_retried(tmp_path, monkeypatch):
+    path = tmp_path / "database.json"
+    write_object = Database._write_object
+    failures = []
+
+    def flaky_write(self, target, parts):
+        if not failures:
+            failures.append(target)
+            raise OSError("disk full")
+        write_object(target, parts)
+
+    async def run():
+        db = Database(str(path), flush_interval=3600)
+        await db.initialize()
+        monkeypatch.setattr(Database, "_write_object", flaky_write)
+        await db.update_guild_config(1, "moderation", "enabled", True)
+        await db.add_warn(1, 2, "spam")
+        await db.flush()
+        await db.close()
+
+        reloaded = Database(str(path), flush_interval=3600)
+        await reloaded.load()
+        return (await reloaded.read_guild_config(1))["moderation"]["enabled"], await reloaded.count_warns(1, 2)
+
+    assert asyncio.run(run()) == (True, 1)
+    assert failures
+
+
+def test_sqlite_migration_keeps_warns(tmp_path):
+    path = tmp_path / "database.json"
+
+    async def run():
+        db = Database(str(path), flush_interval=0)
+        await db.initialize()
+        await db.update_guild_config(1, "moderation", "enabled", True)
+        await db.add_warn(1, 2, "spam")
+        await db.add_warn(1, 2, "küfür")
+        await db.close()
+
+        assert migrate_json(str(path), str(tmp_path / "database.db")) == (1, 2)
+        migrated = Database(str(path), flush_interval=0, storage="sqlite")
+        await migrated.initialize()
+        try:
+            return (await migrated.read_guild_config(1))["moderation"]["enabled"], await migrated.count_warns(1, 2)
+        finally:
+            await migrated.close()
+
+    assert asyncio.run(run()) == (True, 2)
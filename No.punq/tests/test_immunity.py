@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+
+import cogs.moderation as moderation
+
+
+class StubDatabase:
+    def subscribe(self, callback, module=None):
+        pass
+
+
+class FakeBot:
+    async def is_owner(self, user) -> bool:
+        return user.id == 2
+
+
+def _role(role_id: int, administrator: bool = False, manage_guild: bool = False):
+    return SimpleNamespace(id=role_id, permissions=SimpleNamespace(administrator=administrator, manage_guild=manage_guild))
+
+
+EVERYONE, ADMIN, MANAGER = _role(10), _role(11, administrator=True), _role(12, manage_guild=True)
+GUILD = SimpleNamespace(id=10, owner_id=1, roles=[EVERYONE, ADMIN, MANAGER])
+
+
+def _member(member_id: int, *roles):
+    return SimpleNamespace(id=member_id, guild=GUILD, roles=[EVERYONE, *roles])
+
+
+def test_immunity_comes_from_owners_and_admin_roles(monkeypatch):
+    monkeypatch.setattr(moderation, "db", StubDatabase())
+    cog = moderation.Moderation(FakeBot())
+    members = [_member(1), _member(2), _member(3, ADMIN), _member(4, MANAGER), _member(5)]
+
+    async def run(config):
+        cog.immunity.clear()
+        return [await cog.is_immune(member, config) for member in members]
+
+    assert asyncio.run(run({})) == [True, True, True, True, False]
+    assert asyncio.run(run({"scan_admins": True})) == [True, True, False, False, False]
+    # One entry per guild, whoever posted
+    assert list(cog.immunity) == [GUILD.id]
@@ -0,0 +1,68 @@
+import asyncio
+
+import discord
+
+from utils.modlog import MAX_EMBEDS, MAX_MESSAGE_CHARS, ModLogBatcher
+
+
+class Response:
+    status = 400
+    reason = "Bad Request"
+
+
+class FakeChannel:
+    """Rejects messages the way Discord does, and optionally the first one regardless."""
+
+    def __init__(self, fail_first: bool = False):
+        self.id = 1
+        self.fail_first = fail_first
+        self.sent = []
+
+    async def send(self, embeds):
+        if self.fail_first or len(embeds) > MAX_EMBEDS or sum(len(embed) for embed in embeds) > MAX_MESSAGE_CHARS:
+            self.fail_first = False
+            raise discord.HTTPException(Response(), "Invalid Form Body")
+        self.sent.append(embeds)
+
+
+def _entry(i: int):
+    embed = discord.Embed(title="Uyarı", description=f"Kullanıcı {i} uyarıldı. " + "x" * 80)
+    return embed, f"⚠️ Uyarı • <@{10 ** 17 + i}> • sebep: spam {i:>3} " + "x" * 60
+
+
+def _flush(batcher: ModLogBatcher, channel: FakeChannel, count: int):
+    async def run():
+        for i in range(count):
+            batcher.add(channel, *_entry(i))
+        await batcher.close()
+
+    asyncio.run(run())
+    return channel.sent
+
+
+def test_digest_goes_out_one_embed_per_message():
+    channel = FakeChannel()
+    sent = _flush(ModLogBatcher(digest_threshold=5), channel, 60)
+    assert len(sent) == 2 and all(len(embeds) == 1 for embeds in sent)
+    lines = sum(embeds[0].description.count("\n") + 1 for embeds in sent)
+    assert lines == 60
+
+
+def test_long_embeds_are_split_by_total_length():
+    channel = FakeChannel()
+    batcher = ModLogBatcher(digest_threshold=1000)
+
+    async def run():
+        for i in range(MAX_EMBEDS):
+            batcher.add(channel, discord.Embed(title="Ban", description="y" * 1500), f"ban {i}")
+        await batcher.close()
+
+    asyncio.run(run())
+    assert sum(len(embeds) for embeds in channel.sent) == MAX_EMBEDS
+    assert all(sum(len(embed) for embed in embeds) <= MAX_MESSAGE_CHARS for embeds in channel.sent)
+
+
+def test_failed_chunk_does_not_drop_the_rest():
+    channel = FakeChannel(fail_first=True)
+    sent = _flush(ModLogBatcher(digest_threshold=5), channel, 60)
+    assert len(sent) == 1
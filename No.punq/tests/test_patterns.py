@@ -0,0 +1,57 @@
+import asyncio
+
+from utils.patterns import STRIKES, PatternSet, PatternWorker, SearchTimeout
+
+SLOW = r"[a-z]+[a-z0-9]{0,30}\.gift"
+
+
+async def _search_all(patterns: PatternSet, texts):
+    worker = PatternWorker()
+    try:
+        return [await patterns.search(worker, text) for text in texts]
+    finally:
+        await worker.close()
+
+
+def test_match_reports_pattern():
+    patterns = PatternSet("1", [{"pattern": r"free\s*nitro"}, {"pattern": "disabled", "enabled": False}])
+    assert patterns.patterns == (r"free\s*nitro",)
+    results = asyncio.run(_search_all(patterns, ["hello", "get FREE  nitro now"]))
+    assert results == [(None, []), ((r"free\s*nitro", "FREE  nitro"), [])]
+
+
+def test_slow_pattern_is_killed_and_dropped():
+    patterns = PatternSet("1", [{"pattern": SLOW}, {"pattern": "nitro"}])
+    results = asyncio.run(_search_all(patterns, ["a" * 4000] * STRIKES + ["nitro"]))
+    assert [exhausted for _, exhausted in results[:STRIKES - 1]] == [[]] * (STRIKES - 1)
+    (pattern, elapsed), = results[STRIKES - 1][1]
+    assert pattern == SLOW and elapsed < 1
+    assert patterns.patterns == ("nitro",)
+    assert results[-1] == (("nitro", "nitro"), [])
+
+
+class FakeWorker:
+    """Times out on "slow" inputs; otherwise reports a match of the last pattern it was given."""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+
+    async def search(self, key, patterns, text):
+        async with self.lock:
+            await asyncio.sleep(0)
+            if text == "slow":
+                raise SearchTimeout(0, 0.05)
+            return len(patterns) - 1, text
+
+
+def test_concurrent_search_resolves_against_its_own_patterns():
+    patterns = PatternSet("1", [{"pattern": "a+"}, {"pattern": "b"}, {"pattern": "c"}], strikes=1)
+    worker = FakeWorker()
+
+    async def run():
+        return await asyncio.gather(patterns.search(worker, "slow"), patterns.search(worker, "c"))
+
+    (_, exhausted), (found, _) = asyncio.run(run())
+    assert exhausted == [("a+", 0.05)]
+    assert patterns.patterns == ("b", "c")
+    assert found == ("c", "c")
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Set, Tuple
+
+
+class ActionExecutor:
+    """Runs moderation actions off the message handler, queued per guild.
+
+    Each guild gets at most `workers_per_guild` concurrent workers and all guilds share
+    `max_workers` slots, so a raid in one server cannot starve the others or flood the
+    API. Submitting the same (guild, key) again within `collapse_window` seconds is
+    dropped, so a burst of messages from one user is punished once."""
+
+    def __init__(self, workers_per_guild: int = 2, max_workers: int = 16, collapse_window: float = 5.0,
+                 max_queue: int = 500):
+        self.workers_per_guild = workers_per_guild
+        self.collapse_window = collapse_window
+        self.max_queue = max_queue
+        self.logger = logging.getLogger("Actions")
+        self._slots = asyncio.Semaphore(max_workers)
+        self._queues: Dict[int, Deque[Tuple[float, Callable[[], Awaitable[Any]]]]] = {}
+        self._workers: Dict[int, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._recent: "OrderedDict[Tuple[int, Hashable], float]" = OrderedDict()
+        # Submit-to-done seconds of the last completed actions
+        self._latencies: Deque[float] = deque(maxlen=512)
+        self.collapsed = 0
+        self.dropped = 0
+
+    def submit(self, guild_id: int, key: Optional[Hashable], action: Callable[[], Awaitable[Any]]) -> bool:
+        """Queues `action()` for the guild. Returns False if it was collapsed or dropped."""
+        now = time.monotonic()
+        while self._recent and now - next(iter(self._recent.values())) >= self.collapse_window:
+            self._recent.popitem(last=False)
+        if key is not None:
+            if (guild_id, key) in self._recent:
+                self.collapsed += 1
+                return False
+            self._recent[(guild_id, key)] = now
+
+        queue = self._queues.setdefault(guild_id, deque())
+        if len(queue) >= self.max_queue:
+            self.dropped += 1
+            self.logger.warning(f"Action queue of guild {guild_id} is full, dropping action.")
+            return False
+        queue.append((now, action))
+
+        if self._workers.get(guild_id, 0) < min(self.workers_per_guild, len(queue)):
+            self._workers[guild_id] = self._workers.get(guild_id, 0) + 1
+            task = asyncio.create_task(self._work(guild_id, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _work(self, guild_id: int, queue: Deque[Tuple[float, Callable[[], Awaitable[Any]]]]):
+        try:
+            while queue:
+                submitted, action = queue.popleft()
+                async with self._slots:
+                    try:
+                        await action()
+                    except Exception as e:
+                        self.logger.error(f"Moderation action failed in guild {guild_id}: {e}")
+                self._latencies.append(time.monotonic() - submitted)
+        finally:
+            self._workers[guild_id] -= 1
+            if not self._workers[guild_id]:
+                del self._workers[guild_id]
+                if not queue:
+                    self._queues.pop(guild_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and latency (milliseconds) of recently completed actions."""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+        return {
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "running": sum(self._workers.values()),
+            "guilds": len(self._queues),
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "collapsed": self.collapsed,
+            "dropped": self.dropped
+        }
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._queues.clear()
+        self._workers.clear()
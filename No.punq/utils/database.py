@@ -1,183 +1,958 @@
+import contextlib
+import copy
+import glob
 import json
-import aiofiles
 import os
 import asyncio
 import logging
 import discord
-from typing import Any, Dict
+from types import MappingProxyType
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, NamedTuple, Optional, Set, Tuple
+from utils.sqlite_store import SQLiteStore
+from utils.warns import DAY, WarnStore, parse_timestamp
+
+# Bump whenever the stored layout changes; records are upgraded once at load()
+#   2: guild records only hold the values that differ from DEFAULT_GUILD_CONFIG
+#   3: warns moved out of the guild records into the WarnStore / warns table
+SCHEMA_VERSION = 3
+
+DEFAULT_GUILD_CONFIG: Dict[str, Any] = {
+    "moderation": {
+        "enabled": False,
+        "bad_words": [],
+        "whitelist_links": [],
+        "log_channel": None,
+        "spam_protection": False,
+        "spam_threshold": 5,
+        "spam_window": 5,
+        "raid_protection": False,
+        "raid_users": 4,
+        "raid_window": 30,
+        "link_protection": False,
+        "scan_admins": False,
+        "warn_decay_days": 30,
+        "flood_char_percent": 60,
+        "flood_repeat_percent": 30,
+        "flood_max_emojis": 15,
+        "flood_max_mentions": 5,
+        "custom_rules": [],
+        "regex_rules": []
+    },
+    "social": {
+        "youtube": [],
+        "tiktok": [],
+        "kick": [],
+        "instagram": [],
+        "notification_channel": None
+    },
+    "greeting": {
+        "enabled": False,
+        "channel_id": None,
+        "morning_msg": "Günaydın! ☀️",
+        "evening_msg": "İyi Akşamlar! 🌙",
+        "morning_hour": 10,
+        "morning_minute": 0,
+        "evening_hour": 22,
+        "evening_minute": 0
+    },
+    "welcome": {
+        "enabled": False,
+        "channel_id": None,
+        "rules_channel_id": None,
+        "message": "Hoş geldin {user}! Seninle birlikte {count} kişiyiz. Hedefimiz {target} üye! ✨",
+        "leave_enabled": False,
+        "leave_message": "Güle güle {user}! Senden sonra {count} kişi kaldık. 😢",
+        "member_target": 100
+    },
+    "auto_role": {
+        "enabled": False,
+        "role_id": None
+    },
+    "feature_channel": {
+        "enabled": False,
+        "channel_id": None
+    }
+}
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+# Shared read-only view handed out for guilds that have no stored record
+FROZEN_DEFAULTS = _freeze(DEFAULT_GUILD_CONFIG)
+
+
+class LayeredConfig(Mapping):
+    """Read-only view of a sparse override dict on top of a defaults mapping.
+
+    Nothing is copied; sections are merged on access, so building a view is O(1)."""
+    __slots__ = ("_overrides", "_defaults")
+
+    def __init__(self, overrides: Dict[str, Any], defaults: Mapping[str, Any] = FROZEN_DEFAULTS):
+        self._overrides = overrides
+        self._defaults = defaults
+
+    def __getitem__(self, key):
+        if key not in self._overrides:
+            return self._defaults[key]
+        value = self._overrides[key]
+        default = self._defaults.get(key)
+        if isinstance(value, dict) and isinstance(default, Mapping):
+            return LayeredConfig(value, default)
+        return value
+
+    def __iter__(self):
+        yield from self._defaults
+        for key in self._overrides:
+            if key not in self._defaults:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"LayeredConfig({self._overrides!r})"
+
+
+def strip_defaults(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns only the parts of a guild config that differ from DEFAULT_GUILD_CONFIG."""
+    sparse: Dict[str, Any] = {}
+    for section, value in config.items():
+        default = DEFAULT_GUILD_CONFIG.get(section)
+        if isinstance(value, dict) and isinstance(default, dict):
+            changed = {k: v for k, v in value.items() if k not in default or default[k] != v}
+            if changed:
+                sparse[section] = changed
+        elif value != default:
+            sparse[section] = value
+    return sparse
+
+
+def materialize(overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds a full, independent guild config from its sparse overrides."""
+    config = copy.deepcopy(DEFAULT_GUILD_CONFIG)
+    for section, value in overrides.items():
+        if isinstance(value, dict) and isinstance(config.get(section), dict):
+            config[section].update(copy.deepcopy(value))
+        else:
+            config[section] = copy.deepcopy(value)
+    return config
+
+
+class ConfigChange(NamedTuple):
+    """One changed setting as published to Database subscribers. Values are the effective
+    ones (defaults included); key is None when a module is not a dict of settings."""
+    guild_id: str
+    module: str
+    key: Optional[str]
+    old: Any
+    new: Any
+
+
+def diff_configs(guild_id: str, old: Dict[str, Any], new: Dict[str, Any]) -> List[ConfigChange]:
+    """Lists the settings that differ between two full guild configs."""
+    changes = []
+    for module in old.keys() | new.keys():
+        before, after = old.get(module), new.get(module)
+        if before == after:
+            continue
+        if isinstance(before, dict) and isinstance(after, dict):
+            for key in before.keys() | after.keys():
+                if before.get(key) != after.get(key):
+                    changes.append(ConfigChange(guild_id, module, key, before.get(key), after.get(key)))
+        else:
+            changes.append(ConfigChange(guild_id, module, None, before, after))
+    return changes
 
 class Database:
-    def __init__(self, db_path: str = "utils/database.json"):
+    STORAGE_MODES = ("snapshot", "journal", "sqlite", "sharded")
+    # Journal operations that target the warn store instead of the guild configs
+    WARN_OPS = ("warn", "unwarn")
+
+    # Key under which bookkeeping (journal position, ...) is stored inside the snapshot file
+    META_KEY = "_meta"
+    SHARD_INDEX = "_index.json"
+
+    def __init__(self, db_path: str = "utils/database.json", flush_interval: float = 2.0, flush_threshold: int = 100,
+                 storage: str = "snapshot", journal_max_bytes: int = 1024 * 1024, warn_retention_days: int = 90,
+                 shard_cache_size: int = 1000):
         self.db_path = db_path
+        # Sparse per-guild overrides; anything not stored here falls back to DEFAULT_GUILD_CONFIG
         self.data: Dict[str, Any] = {}
         self.logger = logging.getLogger("Database")
         self._lock = asyncio.Lock()
 
+        # Write-behind: mutations only mark the store dirty, a background task persists it.
+        # flush_interval <= 0 disables it and every mutation is saved immediately.
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._dirty = False
+        self._pending_writes = 0
+        self._flush_wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        # Serializes flushes and compactions. With flush_interval <= 0 every mutation
+        # flushes on its own, and a journal append must not land between a compaction's
+        # snapshot and its truncation of the journal.
+        self._flush_lock = asyncio.Lock()
+
+        # Journal mode: mutations are appended to a log next to the snapshot and the
+        # snapshot is only rewritten (compacted) once the log grows past journal_max_bytes.
+        self.storage = storage
+        self.journal_max_bytes = journal_max_bytes
+        self._seq = 0
+        self.schema_version = SCHEMA_VERSION
+        self._journal_buffer: List[str] = []
+
+        # Per-guild JSON fragments of the last save. Only guilds touched since then are
+        # re-encoded on the event loop; joining and writing the file happens in a worker thread.
+        self._encoded: Dict[str, str] = {}
+        self._dirty_guilds: Set[str] = set()
+
+        # Warn history lives apart from the configs (warns.json next to the snapshot, or
+        # the warns table in SQLite mode) and is dropped after warn_retention_days.
+        self.warns = WarnStore(warn_retention_days)
+        self._encoded_warns: Dict[str, str] = {}
+
+        # SQLite mode: configs stay cached in memory, warns only live in the database
+        self._sql: Optional[SQLiteStore] = None
+
+        # Sharded mode: one file per guild plus an index of the guilds that have one.
+        # Records are read on first access and self.data becomes an LRU of at most
+        # shard_cache_size guilds (unsaved ones are never evicted).
+        self.shard_cache_size = shard_cache_size
+        self._shard_index: Set[str] = set()
+        self._index_dirty = False
+
+        # Change notifications: (module or None for all, callback) pairs, see subscribe()
+        self._subscribers: List[Tuple[Optional[str], Callable[[ConfigChange], None]]] = []
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.splitext(self.db_path)[0] + ".journal"
+
+    @property
+    def warns_path(self) -> str:
+        return os.path.splitext(self.db_path)[0] + ".warns.json"
+
+    @property
+    def sqlite_path(self) -> str:
+        return os.path.splitext(self.db_path)[0] + ".db"
+
+    @property
+    def shards_path(self) -> str:
+        return os.path.splitext(self.db_path)[0] + ".shards"
+
+    def _shard_file(self, key: str) -> str:
+        return os.path.join(self.shards_path, f"{key}.json")
+
+    def configure(self, db_path: Optional[str] = None, flush_interval: Optional[float] = None, flush_threshold: Optional[int] = None,
+                  storage: Optional[str] = None, journal_max_bytes: Optional[int] = None, warn_retention_days: Optional[int] = None,
+                  shard_cache_size: Optional[int] = None):
+        """Overrides storage settings. Must be called before initialize()."""
+        if db_path:
+            self.db_path = db_path
+        if flush_interval is not None:
+            self.flush_interval = float(flush_interval)
+        if flush_threshold is not None:
+            self.flush_threshold = max(1, int(flush_threshold))
+        if storage:
+            if storage not in self.STORAGE_MODES:
+                raise ValueError(f"Unknown database storage mode: {storage}")
+            self.storage = storage
+        if journal_max_bytes is not None:
+            self.journal_max_bytes = int(journal_max_bytes)
+        if warn_retention_days is not None:
+            self.warns.retention_days = int(warn_retention_days)
+        if shard_cache_size is not None:
+            self.shard_cache_size = max(1, int(shard_cache_size))
+
     async def initialize(self):
         """Initializes the database by loading data into memory."""
         await self.load()
+        if self.flush_interval > 0 and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Stops the background flusher and persists any pending changes."""
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        if self._sql:
+            await self._sql.close()
+            self._sql = None
 
     async def load(self):
         """Loads the JSON database from disk."""
+        if self.storage == "sqlite":
+            await self._load_sqlite()
+            return
+
+        meta: Dict[str, Any] = {}
+        warns_seq = 0
+        if os.path.exists(self.warns_path):
+            try:
+                warns_seq = await asyncio.to_thread(self._read_warns)
+            except Exception as e:
+                self.logger.error(f"Error loading warns: {e}")
+
+        if self.storage == "sharded" and os.path.isdir(self.shards_path):
+            await self._load_shards()
+            return
+
         if not os.path.exists(self.db_path):
+            if self.storage == "sharded":
+                self.data = OrderedDict()
+                await self._save_shards()
+                return
             self.logger.warning(f"Database file {self.db_path} not found. Creating a new one.")
             self.data = {}
-            await self.save()
+            if self.storage == "journal" and os.path.exists(self.journal_path):
+                await asyncio.to_thread(self._replay_journal, 0, warns_seq)
+            self._dirty_guilds = set(self.data)
+            await self.save(force=True)
             return
 
         try:
-            async with aiofiles.open(self.db_path, mode='r', encoding='utf-8') as f:
-                content = await f.read()
-                if not content.strip():
-                    self.data = {}
-                else:
-                    self.data = json.loads(content)
+            self.data = await asyncio.to_thread(self._read_snapshot)
+            meta = self.data.pop(self.META_KEY, {})
         except Exception as e:
             self.logger.error(f"Error loading database: {e}")
             self.data = {}
 
-    async def save(self):
-        """Saves the current state of data to the JSON file."""
+        self._seq = meta.get("journal_seq", 0)
+        self.schema_version = meta.get("schema_version", 0)
+        if self.storage == "journal" and os.path.exists(self.journal_path):
+            await asyncio.to_thread(self._replay_journal, self._seq, warns_seq)
+        migrated = self._migrate()
+        pruned = self.warns.prune(int(discord.utils.utcnow().timestamp()))
+
+        if self.storage == "sharded":
+            # First start in sharded mode: split the snapshot into per-guild files
+            self.logger.info(f"Splitting {self.db_path} into {self.shards_path}.")
+            self.data = OrderedDict(self.data)
+            self._dirty_guilds = set(self.data)
+            self._index_dirty = True
+            self.warns.dirty = set(self.warns.members)
+            await self._save_shards()
+            return
+
+        # Nothing else touches the data during startup, so the initial encode can run off-loop
+        self._encoded = await asyncio.to_thread(lambda: {k: self._encode(v) for k, v in self.data.items()})
+        self._encoded_warns = await asyncio.to_thread(lambda: {k: self.warns.encode_member(k) for k in self.warns.members})
+        self._dirty_guilds.clear()
+        self.warns.dirty.clear()
+        if migrated or pruned:
+            await (self.compact() if self.storage == "journal" else self.save(force=True))
+
+    async def _load_shards(self):
+        """Reads only the shard index. Guild records are loaded on first access."""
+        try:
+            index = await asyncio.to_thread(self._read_shard_index)
+        except Exception as e:
+            self.logger.error(f"Error loading shard index: {e}")
+            # Rebuild it from the directory listing
+            index = {"guilds": [os.path.basename(path)[:-5] for path in glob.glob(os.path.join(self.shards_path, "*.json"))
+                                if os.path.basename(path) != self.SHARD_INDEX]}
+            self._index_dirty = True
+        self._shard_index = set(index.get("guilds", []))
+        self.schema_version = index.get("schema_version", 0)
+        self.data = OrderedDict()
+        self._encoded_warns = await asyncio.to_thread(lambda: {k: self.warns.encode_member(k) for k in self.warns.members})
+        self.warns.dirty.clear()
+
+        if self.schema_version < SCHEMA_VERSION:
+            # Format upgrades are the one case that has to read every shard
+            self.data = OrderedDict(await asyncio.to_thread(self._read_all_shards))
+            self._migrate()
+            self._index_dirty = True
+        if self.warns.prune(int(discord.utils.utcnow().timestamp())) or self._dirty_guilds or self._index_dirty:
+            await self._save_shards()
+
+    def _read_shard_index(self) -> Dict[str, Any]:
+        with open(os.path.join(self.shards_path, self.SHARD_INDEX), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_shard(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._shard_file(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _read_all_shards(self) -> Dict[str, Any]:
+        records = {}
+        for key in self._shard_index:
+            record = self._read_shard(key)
+            if record:
+                records[key] = record
+        return records
+
+    async def _record(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the stored overrides of a guild, reading its shard if it is not cached."""
+        if key in self.data:
+            if self.storage == "sharded":
+                self.data.move_to_end(key)
+            return self.data[key]
+        if self.storage != "sharded" or key not in self._shard_index:
+            return None
+
+        record = await asyncio.to_thread(self._read_shard, key)
+        if record is None:
+            return None
+        # Another coroutine may have loaded (and changed) it while we were reading
+        record = self.data.setdefault(key, record)
+        self.data.move_to_end(key)
+        # The record is returned to a caller that may be about to change it, so it stays cached
+        self._evict(keep=key)
+        return record
+
+    async def _save_shards(self) -> bool:
+        """Rewrites the shards of the guilds changed since the last save, then trims the cache."""
         async with self._lock:
+            dirty, self._dirty_guilds = self._dirty_guilds, set()
+            writes: Dict[str, Optional[str]] = {}
+            for key in dirty:
+                if key in self.data:
+                    writes[key] = json.dumps(self.data[key], indent=4, ensure_ascii=False)
+                    if key not in self._shard_index:
+                        self._shard_index.add(key)
+                        self._index_dirty = True
+                else:
+                    writes[key] = None
+                    if key in self._shard_index:
+                        self._shard_index.discard(key)
+                        self._index_dirty = True
+
+            index = None
+            if self._index_dirty:
+                index = json.dumps({"schema_version": self.schema_version, "guilds": sorted(self._shard_index)})
+                self._index_dirty = False
+            warn_dirty = set(self.warns.dirty)
+            warns = self._warn_parts() if warn_dirty else None
             try:
-                async with aiofiles.open(self.db_path, mode='w', encoding='utf-8') as f:
-                    await f.write(json.dumps(self.data, indent=4, ensure_ascii=False))
+                await asyncio.to_thread(self._write_shards, writes, index, warns)
+            except Exception as e:
+                self.logger.error(f"Error saving database shards: {e}")
+                self._dirty_guilds |= dirty
+                self.warns.dirty |= warn_dirty
+                self._index_dirty = self._index_dirty or index is not None
+                return False
+
+        self._evict()
+        return True
+
+    def _write_shards(self, writes: Dict[str, Optional[str]], index: Optional[str], warns: Optional[Dict[str, str]]):
+        os.makedirs(self.shards_path, exist_ok=True)
+        for key, content in writes.items():
+            if content is None:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._shard_file(key))
+            else:
+                self._write_text(self._shard_file(key), content)
+        if index is not None:
+            self._write_text(os.path.join(self.shards_path, self.SHARD_INDEX), index)
+        if warns is not None:
+            self._write_object(self.warns_path, warns)
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drops the least recently used guilds beyond shard_cache_size. Unsaved ones and `keep` stay."""
+        excess = len(self.data) - self.shard_cache_size
+        if excess <= 0:
+            return
+        for key in list(self.data):
+            if excess <= 0:
+                break
+            if key not in self._dirty_guilds and key != keep:
+                del self.data[key]
+                excess -= 1
+
+    async def _load_sqlite(self):
+        if not os.path.exists(self.sqlite_path) and os.path.exists(self.db_path):
+            self.logger.warning(f"{self.sqlite_path} not found. Run `python -m utils.sqlite_store` to import {self.db_path}.")
+        if self._sql is None:
+            self._sql = SQLiteStore(self.sqlite_path)
+            await self._sql.open()
+        self.data = await self._sql.load_configs()
+        self.schema_version = int(await self._sql.get_meta("schema_version", 0))
+        self._dirty_guilds.clear()
+        if self._migrate():
+            # Warns still embedded in old guild rows go to the warns table
+            await self._sql.import_warns(list(self.warns.items()))
+            self.warns = WarnStore(self.warns.retention_days)
+            if await self._flush_sqlite():
+                await self._sql.set_meta("schema_version", self.schema_version)
+        if self.warns.retention_days > 0:
+            cutoff = int(discord.utils.utcnow().timestamp()) - self.warns.retention_days * DAY
+            await self._sql.prune_warns(cutoff)
+
+    def _migrate(self) -> bool:
+        """Upgrades records written by older versions. Runs once per schema version
+        instead of on every read."""
+        if self.schema_version >= SCHEMA_VERSION:
+            return False
+        for key in list(self.data):
+            current = self.data[key]
+            if not isinstance(current, dict):
+                continue
+            for user_id, user in (current.pop("users", None) or {}).items():
+                for warn in user.get("warns", []):
+                    self.warns.add(key, user_id, warn.get("reason", ""), parse_timestamp(warn.get("timestamp")))
+            sparse = strip_defaults(current)
+            if sparse:
+                self.data[key] = sparse
+            else:
+                del self.data[key]
+            self._dirty_guilds.add(key)
+        self.logger.info(f"Migrated guild records to schema version {SCHEMA_VERSION}.")
+        self.schema_version = SCHEMA_VERSION
+        return True
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        with open(self.db_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return json.loads(content) if content.strip() else {}
+
+    def _read_warns(self) -> int:
+        """Loads the warns file and returns the journal position it was written at."""
+        with open(self.warns_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        document = json.loads(content) if content.strip() else {}
+        meta = document.pop(self.META_KEY, {})
+        self.warns.load(meta.get("reasons", []), document)
+        return meta.get("journal_seq", 0)
+
+    def _replay_journal(self, snapshot_seq: int, warns_seq: int):
+        """Re-applies journal records newer than the snapshot. A torn trailing record
+        (crash in the middle of an append) is dropped and cut off the file."""
+        replayed = 0
+        good_offset = 0
+        with open(self.journal_path, "rb") as f:
+            for raw in f:
+                try:
+                    if not raw.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(raw)
+                except ValueError:
+                    self.logger.warning(f"Discarding corrupt journal tail at byte {good_offset}.")
+                    break
+                good_offset += len(raw)
+                if record["seq"] <= (warns_seq if record["op"] in self.WARN_OPS else snapshot_seq):
+                    continue
+                self._apply(record["op"], record["guild"], record["path"], record.get("value"))
+                self._seq = record["seq"]
+                replayed += 1
+
+        if good_offset < os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_offset)
+        if replayed:
+            self.logger.info(f"Replayed {replayed} journal records.")
+
+    async def save(self, force: bool = False) -> bool:
+        """Saves the current state of data to the JSON file.
+
+        Only guilds changed since the last save are encoded on the event loop. Joining the
+        document and the disk write run in a worker thread, and the file is replaced
+        atomically so a crash never leaves a truncated database behind. The config
+        snapshot and the warns file are each rewritten only if they changed (or force)."""
+        if self.storage == "sharded":
+            return await self._save_shards()
+        async with self._lock:
+            # The parts helpers clear the dirty sets; a failed write puts them back for the retry
+            dirty, warn_dirty = set(self._dirty_guilds), set(self.warns.dirty)
+            snapshot = self._snapshot_parts() if force or dirty else None
+            warns = self._warn_parts() if force or warn_dirty else None
+            try:
+                await asyncio.to_thread(self._write_files, snapshot, warns, False)
+                return True
             except Exception as e:
                 self.logger.error(f"Error saving database: {e}")
+                self._dirty_guilds |= dirty
+                self.warns.dirty |= warn_dirty
+                return False
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        # Indented one level deeper so fragments slot straight into the top-level object
+        return json.dumps(value, indent=4, ensure_ascii=False).replace("\n", "\n    ")
+
+    def _snapshot_parts(self) -> Dict[str, str]:
+        """Returns an immutable view of the current data as pre-encoded fragments."""
+        for key in self._dirty_guilds:
+            if key in self.data:
+                self._encoded[key] = self._encode(self.data[key])
+            else:
+                self._encoded.pop(key, None)
+        self._dirty_guilds.clear()
+        meta = {"journal_seq": self._seq, "schema_version": self.schema_version}
+        return {self.META_KEY: self._encode(meta), **self._encoded}
+
+    def _warn_parts(self) -> Dict[str, str]:
+        for key in self.warns.dirty:
+            fragment = self.warns.encode_member(key)
+            if fragment is None:
+                self._encoded_warns.pop(key, None)
+            else:
+                self._encoded_warns[key] = fragment
+        self.warns.dirty.clear()
+        meta = {"journal_seq": self._seq, "reasons": self.warns.reasons}
+        return {self.META_KEY: json.dumps(meta, ensure_ascii=False), **self._encoded_warns}
+
+    def _write_files(self, snapshot: Optional[Dict[str, str]], warns: Optional[Dict[str, str]], truncate_journal: bool):
+        if warns is not None:
+            self._write_object(self.warns_path, warns)
+        if snapshot is not None:
+            self._write_object(self.db_path, snapshot)
+
+        if truncate_journal:
+            # Only drop the journal once the new files are durable. Records still
+            # sitting in the buffer have a higher seq and land in the fresh journal.
+            with open(self.journal_path, "w", encoding="utf-8"):
+                pass
+
+    @staticmethod
+    def _write_text(path: str, content: str):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _write_object(path: str, parts: Dict[str, str]):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # Written fragment by fragment: one huge join would hold the GIL and stall the loop
+            separator = "{\n"
+            for key, fragment in parts.items():
+                f.write(f"{separator}    {json.dumps(key, ensure_ascii=False)}: {fragment}")
+                separator = ",\n"
+            f.write("\n}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def mark_dirty(self):
+        """Flags unsaved changes and wakes the flusher once enough writes piled up."""
+        self._dirty = True
+        self._pending_writes += 1
+        if self._pending_writes >= self.flush_threshold:
+            self._flush_wakeup.set()
+
+    async def flush(self):
+        """Writes pending changes to disk, if there are any."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            pending = self._pending_writes
+            self._pending_writes = 0
+
+            if self.storage == "journal":
+                saved = await self._flush_journal()
+            elif self.storage == "sqlite":
+                saved = await self._flush_sqlite()
+            elif self.storage == "sharded":
+                saved = await self._save_shards()
+            else:
+                saved = await self.save()
+
+            if not saved:
+                # Keep the changes queued so the next cycle retries them
+                self._dirty = True
+                self._pending_writes += pending
+
+    async def _flush_journal(self) -> bool:
+        records, self._journal_buffer = self._journal_buffer, []
+        try:
+            size = await asyncio.to_thread(self._append_journal, records)
+        except Exception as e:
+            self.logger.error(f"Error writing database journal: {e}")
+            self._journal_buffer[:0] = records
+            return False
+
+        if size >= self.journal_max_bytes:
+            await self._compact()
+        return True
+
+    async def _flush_sqlite(self) -> bool:
+        dirty, self._dirty_guilds = self._dirty_guilds, set()
+        rows, deleted = [], []
+        for key in dirty:
+            if key in self.data:
+                rows.append((key, {module: json.dumps(value, ensure_ascii=False) for module, value in self.data[key].items()}))
+            else:
+                deleted.append(key)
+        try:
+            await self._sql.write_guilds(rows, deleted)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error writing to SQLite database: {e}")
+            self._dirty_guilds |= dirty
+            return False
+
+    def _append_journal(self, records: List[str]) -> int:
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            if records:
+                f.write("".join(records))
+                f.flush()
+                os.fsync(f.fileno())
+            return f.tell()
+
+    async def compact(self):
+        """Folds the journal into a fresh snapshot and truncates it."""
+        async with self._flush_lock:
+            await self._compact()
+
+    async def _compact(self):
+        # Callers hold _flush_lock, so no journal append can run until the truncation is done
+        async with self._lock:
+            # Taken right here so both files match self._seq exactly
+            snapshot = self._snapshot_parts()
+            warns = self._warn_parts()
+            try:
+                await asyncio.to_thread(self._write_files, snapshot, warns, True)
+            except Exception as e:
+                self.logger.error(f"Error compacting database: {e}")
+                return
+        self.logger.info("Database journal compacted.")
+
+    def _apply(self, op: str, guild: str, path: List[str], value: Any = None):
+        """Applies a single mutation record to the in-memory data."""
+        if op == "warn":
+            created_at, reason = value
+            self.warns.add(guild, path[0], reason, created_at)
+            return
+        if op == "unwarn":
+            self.warns.clear(guild, path[0])
+            return
+
+        if op == "delete":
+            keys = [guild, *path]
+            chain = [self.data]
+            for key in keys[:-1]:
+                node = chain[-1].get(key)
+                if not isinstance(node, dict):
+                    return
+                chain.append(node)
+            chain[-1].pop(keys[-1], None)
+            # Drop containers left empty, so unconfigured guilds take no space at all
+            for i in range(len(chain) - 1, 0, -1):
+                if chain[i]:
+                    break
+                chain[i - 1].pop(keys[i - 1], None)
+            return
+
+        if not path:
+            self.data[guild] = value
+            return
+
+        node = self.data.setdefault(guild, {})
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        last = path[-1]
+        if op == "set":
+            node[last] = value
+        elif op == "append":
+            node.setdefault(last, []).append(value)
+
+    async def _mutate(self, op: str, guild: str, path: List[str], value: Any = None):
+        """Applies a mutation, notifies subscribers and persists it (journal record or full save)."""
+        before = None
+        if op not in self.WARN_OPS:
+            # Sharded mode: the record has to be in memory before it is changed
+            before = await self._record(guild)
+            if self._subscribers:
+                before = materialize(before or {})
+        self._apply(op, guild, path, value)
+        if op not in self.WARN_OPS:
+            self._dirty_guilds.add(guild)
+            if self._subscribers:
+                self._publish(diff_configs(guild, before, materialize(self.data.get(guild) or {})))
+        if self.storage == "journal":
+            self._seq += 1
+            record = {"seq": self._seq, "op": op, "guild": guild, "path": path}
+            if op != "delete":
+                record["value"] = value
+            self._journal_buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        await self._persist()
+
+    def subscribe(self, callback: Callable[[ConfigChange], None], module: Optional[str] = None):
+        """Calls `callback` with a ConfigChange for every changed setting (of `module` only,
+        if given). Callbacks run synchronously right after the change is applied, before it
+        is persisted, so they should only invalidate or patch derived state."""
+        self._subscribers.append((module, callback))
+
+    def unsubscribe(self, callback: Callable[[ConfigChange], None]):
+        self._subscribers = [(module, cb) for module, cb in self._subscribers if cb != callback]
+
+    def _publish(self, changes: List[ConfigChange]):
+        for change in changes:
+            for module, callback in self._subscribers:
+                if module is not None and module != change.module:
+                    continue
+                try:
+                    callback(change)
+                except Exception as e:
+                    self.logger.error(f"Config change subscriber {callback!r} failed: {e}")
+
+    async def _persist(self):
+        """Persists a mutation, either right away or through the write-behind flusher."""
+        self.mark_dirty()
+        if self._flusher is None:
+            await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            await self.flush()
 
     async def get_guild_config(self, guild_id: int) -> Dict[str, Any]:
-        """Retrieves configuration for a specific guild."""
-        key = str(guild_id)
-        
-        defaults = {
-            "moderation": {
-                "enabled": False,
-                "bad_words": [],
-                "whitelist_links": [],
-                "log_channel": None,
-                "spam_protection": False,
-                "link_protection": False,
-                "scan_admins": False
-            },
-            "social": {
-                "youtube": [],
-                "tiktok": [],
-                "kick": [],
-                "instagram": [],
-                "notification_channel": None
-            },
-            "greeting": {
-                "enabled": False,
-                "channel_id": None,
-                "morning_msg": "Günaydın! ☀️",
-                "evening_msg": "İyi Akşamlar! 🌙",
-                "morning_hour": 10,
-                "morning_minute": 0,
-                "evening_hour": 22,
-                "evening_minute": 0
-            },
-            "welcome": {
-                "enabled": False,
-                "channel_id": None,
-                "rules_channel_id": None,
-                "message": "Hoş geldin {user}! Seninle birlikte {count} kişiyiz. Hedefimiz {target} üye! ✨",
-                "leave_enabled": False,
-                "leave_message": "Güle güle {user}! Senden sonra {count} kişi kaldık. 😢",
-                "member_target": 100
-            },
-            "auto_role": {
-                "enabled": False,
-                "role_id": None
-            },
-            "feature_channel": {
-                "enabled": False,
-                "channel_id": None
-            },
-            "users": {}
-        }
-
-        if key not in self.data:
-            self.data[key] = defaults
-            await self.save()
-            return self.data[key]
-            
-        # Ensure deep keys exist for existing records (Migration)
-        current = self.data[key]
-        modified = False
-        
-        for section, content in defaults.items():
-            if section not in current:
-                current[section] = content
-                modified = True
-            elif isinstance(content, dict):
-                for k, v in content.items():
-                    if k not in current[section]:
-                        current[section][k] = v
-                        modified = True
-                        
-        if modified:
-            await self.save()
-            
-        return self.data[key]
+        """Returns a full, mutable copy of a guild's configuration.
+
+        Changes to the copy are not persisted; write them back with update_guild_config."""
+        return materialize(await self._record(str(guild_id)) or {})
+
+    async def read_guild_config(self, guild_id: int) -> Mapping[str, Any]:
+        """Read-only lookup for hot paths. Never creates records or touches the disk.
+
+        Returns the stored overrides layered over the shared defaults (guilds without a
+        record get the frozen defaults themselves). The mapping must not be mutated."""
+        overrides = await self._record(str(guild_id))
+        return LayeredConfig(overrides) if overrides else FROZEN_DEFAULTS
 
     async def update_guild_config(self, guild_id: int, module: str, key: str, value: Any):
         """Updates a specific configuration setting for a guild."""
         guild_key = str(guild_id)
-        await self.get_guild_config(guild_id) # Ensure defaults exist
-        
-        if module not in self.data[guild_key]:
-            self.data[guild_key][module] = {}
-            
-        self.data[guild_key][module][key] = value
-        await self.save()
-
-    async def add_warn(self, guild_id: int, user_id: int, reason: str):
-        """Adds a warning to a user and returns total warn count."""
+        default = DEFAULT_GUILD_CONFIG.get(module)
+        if isinstance(default, dict) and key in default and default[key] == value:
+            # Back to the default: drop the override instead of storing a copy of it
+            if key in ((await self._record(guild_key)) or {}).get(module, {}):
+                await self._mutate("delete", guild_key, [module, key])
+            return
+        await self._mutate("set", guild_key, [module, key], value)
+
+    async def update_guild_config_many(self, guild_id: int, module: str, values: Dict[str, Any]):
+        """Updates several settings of one module and persists them once."""
+        async with self.transaction(guild_id) as config:
+            config.setdefault(module, {}).update(values)
+
+    @contextlib.asynccontextmanager
+    async def transaction(self, guild_id: int) -> AsyncIterator[Dict[str, Any]]:
+        """Yields a full, mutable copy of a guild's config and commits it on exit.
+
+        All sections changed inside the block are written as a single mutation (one
+        journal record, one save). Sections the block left untouched are taken from the
+        live data at commit time, so concurrent writes to them (e.g. warns) survive.
+        Nothing is written if the block raises.
+
+            async with db.transaction(guild.id) as cfg:
+                cfg["moderation"]["enabled"] = True
+                cfg["moderation"]["log_channel"] = channel.id
+        """
+        key = str(guild_id)
+        original = materialize(await self._record(key) or {})
+        config = copy.deepcopy(original)
+        yield config
+
+        changed = {section: value for section, value in config.items() if original.get(section) != value}
+        removed = [section for section in original if section not in config]
+        if not changed and not removed:
+            return
+
+        merged = materialize(await self._record(key) or {})
+        merged.update(changed)
+        for section in removed:
+            merged.pop(section, None)
+        await self.set(key, merged)
+
+    async def _decay_start(self, guild_key: str, now: int) -> int:
+        """Start of the window in which warns still count towards escalation."""
+        config = await self.read_guild_config(guild_key)
+        days = config["moderation"].get("warn_decay_days") or 0
+        return now - days * DAY if days > 0 else 0
+
+    async def add_warn(self, guild_id: int, user_id: int, reason: str) -> int:
+        """Adds a warning to a user and returns how many of their warns are still active
+        (issued inside the guild's warn_decay_days window)."""
+        guild_key = str(guild_id)
+        user_key = str(user_id)
+        now = int(discord.utils.utcnow().timestamp())
+        since = await self._decay_start(guild_key, now)
+
+        if self._sql:
+            return await self._sql.add_warn(guild_key, user_key, reason, now, since)
+
+        await self._mutate("warn", guild_key, [user_key], [now, reason])
+        return self.warns.count(guild_key, user_key, since)
+
+    async def count_warns(self, guild_id: int, user_id: int, since: Optional[int] = None) -> int:
+        """Counts a user's warns issued at or after `since` (epoch seconds).
+        Defaults to the guild's decay window."""
         guild_key = str(guild_id)
         user_key = str(user_id)
-        await self.get_guild_config(guild_id)
-
-        if "users" not in self.data[guild_key]:
-            self.data[guild_key]["users"] = {}
-        
-        if user_key not in self.data[guild_key]["users"]:
-            self.data[guild_key]["users"][user_key] = {"warns": []}
-            
-        self.data[guild_key]["users"][user_key]["warns"].append({
-            "reason": reason,
-            "timestamp": discord.utils.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        await self.save()
-        return len(self.data[guild_key]["users"][user_key]["warns"])
+        if since is None:
+            since = await self._decay_start(guild_key, int(discord.utils.utcnow().timestamp()))
+
+        if self._sql:
+            return await self._sql.count_warns(guild_key, user_key, since)
+        return self.warns.count(guild_key, user_key, since)
 
     async def clear_warns(self, guild_id: int, user_id: int):
-        """Clears all warnings for a user."""
+        """Clears all warnings for a user. Returns False if there was nothing to clear."""
         guild_key = str(guild_id)
         user_key = str(user_id)
-        
-        if guild_key in self.data and "users" in self.data[guild_key] and user_key in self.data[guild_key]["users"]:
-            self.data[guild_key]["users"][user_key]["warns"] = []
-            await self.save()
+
+        if self._sql:
+            return await self._sql.clear_warns(guild_key, user_key)
+
+        if self.warns.count(guild_key, user_key):
+            await self._mutate("unwarn", guild_key, [user_key])
             return True
         return False
 
     async def get(self, key: str, default: Any = None) -> Any:
         """Retrieves a value by key."""
-        return self.data.get(key, default)
+        record = await self._record(key)
+        return default if record is None else record
 
     async def set(self, key: str, value: Any):
-        """Sets a value and saves the database."""
-        self.data[key] = value
-        await self.save()
+        """Sets a value and saves the database. Guild configs are stored as overrides only."""
+        if isinstance(value, dict):
+            value = strip_defaults(value)
+            if not value:
+                await self.delete(key)
+                return
+        await self._mutate("set", key, [], value)
 
     async def delete(self, key: str):
         """Deletes a key and saves the database."""
-        if key in self.data:
-            del self.data[key]
-            await self.save()
+        if await self._record(key) is not None:
+            await self._mutate("delete", key, [])
 
     async def get_all(self) -> Dict[str, Any]:
-        """Returns all data."""
-        return self.data
+        """Returns all stored data (sparse overrides, see read_guild_config for merged views).
+
+        In sharded mode this reads every shard that is not cached, without filling the cache."""
+        if self.storage != "sharded":
+            return self.data
+        missing = [key for key in self._shard_index if key not in self.data]
+        loaded = await asyncio.to_thread(lambda: {key: self._read_shard(key) for key in missing})
+        return {**{key: record for key, record in loaded.items() if record}, **self.data}
 
 db = Database()
@@ -0,0 +1,54 @@
+import re
+import zlib
+from collections import Counter
+from typing import Any, Mapping, NamedTuple, Optional
+
+# Custom (<:name:id>, <a:name:id>) and unicode emoji
+EMOJI = re.compile(r"<a?:\w+:\d+>|[\U0001F000-\U0001FAFF☀-➿⬀-⯿]")
+# User, role and @everyone/@here mentions, repeats of the same target included
+MENTION = re.compile(r"<@[!&]?\d+>|@everyone|@here")
+
+# Messages shorter than these are never flagged by the ratio checks
+MIN_CHAR_LENGTH = 10
+MIN_REPEAT_LENGTH = 60
+
+
+class FloodLimits(NamedTuple):
+    char_percent: int     # share of the message taken by a single character
+    repeat_percent: int   # compressed size / original size, lower means more repetition
+    max_emojis: int
+    max_mentions: int
+
+    @classmethod
+    def from_config(cls, mod_config: Mapping[str, Any]) -> "FloodLimits":
+        return cls(
+            mod_config.get("flood_char_percent", 60),
+            mod_config.get("flood_repeat_percent", 30),
+            mod_config.get("flood_max_emojis", 15),
+            mod_config.get("flood_max_mentions", 5)
+        )
+
+
+def detect_flood(raw: str, stripped: str, limits: FloodLimits) -> Optional[str]:
+    """Returns the punishment reason if the message is a flood, None otherwise.
+
+    `stripped` is the whitespace-free normalized text. Every check is a single linear,
+    C-level pass (Counter, zlib, regex); a limit of 0 disables its check."""
+    if limits.char_percent and len(raw) > MIN_CHAR_LENGTH and len(stripped) > 5:
+        _, top = Counter(stripped).most_common(1)[0]
+        if top * 100 > len(stripped) * limits.char_percent:
+            return "Gereksiz Karakter Tekrarı (Spam)"
+
+    if limits.repeat_percent and len(stripped) >= MIN_REPEAT_LENGTH:
+        # Repeated substrings ("spam spam spam ...", copy-pasted blocks) compress extremely well
+        data = stripped.encode("utf-8")
+        if len(zlib.compress(data, 1)) * 100 < len(data) * limits.repeat_percent:
+            return "Tekrarlanan Metin (Spam)"
+
+    if limits.max_emojis and len(EMOJI.findall(raw)) > limits.max_emojis:
+        return "Emoji Seli (Spam)"
+
+    if limits.max_mentions and len(MENTION.findall(raw)) > limits.max_mentions:
+        return "Etiket Seli (Spam)"
+
+    return None
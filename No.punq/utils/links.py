@@ -0,0 +1,168 @@
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+URL_PATTERN = re.compile(r"https?://[^\s<>\"'|]+|www\.[^\s<>\"'|]+")
+# Discord invites (ads)
+INVITE_PATTERN = re.compile(r"(discord(?:app)?\.com/invite/|discord\.gg/)[a-zA-Z0-9]+")
+
+
+def parse_host(url: str) -> Optional[str]:
+    """Lowercased host of a URL found in a message, without port, trailing dot or "www."."""
+    if not url.startswith(("http://", "https://")):
+        url = "http://" + url
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.rstrip(".")
+    return host[4:] if host.startswith("www.") else host
+
+
+def extract_hosts(text: str) -> List[str]:
+    """Hosts of every link in the (casefolded) message text, in order, without duplicates."""
+    hosts = []
+    for match in URL_PATTERN.finditer(text):
+        host = parse_host(match.group())
+        if host and host not in hosts:
+            hosts.append(host)
+    return hosts
+
+
+def parent_domains(host: str) -> Iterable[str]:
+    """host itself, then each parent: a.b.example.com, b.example.com, example.com, com."""
+    while True:
+        yield host
+        dot = host.find(".")
+        if dot < 0:
+            return
+        host = host[dot + 1:]
+
+
+class DomainTrie:
+    """Set of domains stored as a trie of reversed labels (com -> youtube -> www).
+
+    A host matches if it equals an entry or is a subdomain of one, so "youtube.com"
+    allows "m.youtube.com" but not "youtube.com.evil.tld". Lookups cost one dict step
+    per label of the host."""
+    __slots__ = ("_root",)
+    END = ""
+
+    def __init__(self, domains: Iterable[str] = ()):
+        self._root = {}
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain: str):
+        host = parse_host(domain.strip().lower())
+        if not host:
+            return
+        node = self._root
+        for label in reversed(host.split(".")):
+            node = node.setdefault(label, {})
+        node[self.END] = True
+
+    def __bool__(self):
+        return bool(self._root)
+
+    def matches(self, host: str) -> bool:
+        node = self._root
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self.END in node:
+                return True
+        return False
+
+
+def domain_hash(domain: str) -> int:
+    return int.from_bytes(hashlib.blake2b(domain.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class Blocklist:
+    """Large phishing/malware domain list kept as a sorted array of 64-bit hashes.
+
+    The file is memory-mapped, so it costs no Python objects per domain and pages are
+    only loaded as lookups touch them; a lookup is a binary search per parent domain.
+    Build the file with `python -m utils.links domains.txt utils/blocklist.bin`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._hashes = memoryview(self._map).cast("Q")
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __contains__(self, domain: str) -> bool:
+        value = domain_hash(domain)
+        index = bisect_left(self._hashes, value)
+        return index < len(self._hashes) and self._hashes[index] == value
+
+    def match(self, host: str) -> Optional[str]:
+        """Returns the listed domain covering `host` (itself or a parent), if any."""
+        for domain in parent_domains(host):
+            if domain in self:
+                return domain
+        return None
+
+    def close(self):
+        self._hashes.release()
+        self._map.close()
+        self._file.close()
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> Optional["Blocklist"]:
+        if not path or not os.path.exists(path) or not os.path.getsize(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            logging.getLogger("Links").error(f"Could not load blocklist {path}: {e}")
+            return None
+
+
+def build_blocklist(source: str, target: str) -> Tuple[int, int]:
+    """Hashes a one-domain-per-line text file (hosts-file lines and # comments are
+    accepted) into a sorted binary blocklist. Returns (lines read, domains written)."""
+    hashes = set()
+    lines = 0
+    with open(source, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            lines += 1
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            host = parse_host(line.split()[-1].lower())
+            if host:
+                hashes.add(domain_hash(host))
+
+    values = array("Q", sorted(hashes))
+    if values.itemsize != 8:
+        raise RuntimeError("Unsigned long long is not 64 bits on this platform.")
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "wb") as f:
+        values.tofile(f)
+    os.replace(tmp_path, target)
+    return lines, len(values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds the compact link blocklist from a domain list.")
+    parser.add_argument("source", help="Text file with one domain (or hosts-file entry) per line")
+    parser.add_argument("target", nargs="?", default="utils/blocklist.bin")
+    args = parser.parse_args()
+
+    read, written = build_blocklist(args.source, args.target)
+    print(f"Read {read} lines, wrote {written} domains to {args.target}")
@@ -0,0 +1,180 @@
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate, groupby
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from utils.normalize import LEET, NormalizedText, folds_letters, normalize
+
+
+class WordMatcher:
+    """Aho-Corasick automaton over a fixed set of words.
+
+    Built once per word list; search() finds any of the words as a substring in a single
+    pass over the text, no matter how many words there are, and reports which one matched."""
+    __slots__ = ("words", "_goto", "_fail", "_out", "_ends")
+
+    def __init__(self, words: Iterable[str]):
+        self.words = tuple(dict.fromkeys(word for word in words if word))
+        goto = [{}]
+        out = [None]
+        for word in self.words:
+            node = 0
+            for char in word:
+                nxt = goto[node].get(char)
+                if nxt is None:
+                    nxt = goto[node][char] = len(goto)
+                    goto.append({})
+                    out.append(None)
+                node = nxt
+            if out[node] is None:
+                out[node] = word
+        # Words ending exactly at each node, before failure-link inheritance
+        ends = list(out)
+
+        # Failure links in breadth-first order; each node also inherits the match of its
+        # failure target, so a hit is a single lookup during the search
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in goto[node].items():
+                queue.append(nxt)
+                target = fail[node]
+                while target and char not in goto[target]:
+                    target = fail[target]
+                fail[nxt] = goto[target].get(char, 0)
+                if out[nxt] is None:
+                    out[nxt] = out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self._ends = ends
+
+    def __bool__(self):
+        return bool(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def search(self, text: str) -> Optional[str]:
+        """Returns the first word found in `text` (by end position), or None."""
+        if not self.words:
+            return None
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node] is not None:
+                return out[node]
+        return None
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yields (end index, word) for every occurrence of every word in `text`."""
+        if not self.words:
+            return
+        goto, fail, ends = self._goto, self._fail, self._ends
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            suffix = node
+            while suffix:
+                if ends[suffix] is not None:
+                    yield index + 1, ends[suffix]
+                suffix = fail[suffix]
+
+
+def _spans_words(bounds: List[int], start: int, end: int) -> bool:
+    """Whether [start, end) of the space-stripped text lies inside one word or is made of whole words.
+
+    "s a l a k" and "sa lak" qualify, "tamam kanal" (-> "amk") does not."""
+    first = bisect_right(bounds, start) - 1
+    if bisect_right(bounds, end - 1) - 1 == first:
+        return True
+    return bounds[first] == start and end in bounds
+
+
+# Terms up to this many letters that lose a diacritic when folded are matched as written
+SHORT_TERM = 3
+# Leetspeak only, diacritics kept ("p1ç" -> "piç")
+_UNLEET = str.maketrans(LEET)
+
+
+class TermMatcher:
+    """Filter terms matched against a NormalizedText.
+
+    Terms are searched in the folded, stripped and squeezed forms, so obfuscation
+    ("s a l 4 k", "yavşşşak" -> "yavsak") is caught; hits that only exist once spaces are
+    removed must not join parts of different words ("tamam kanal"). Short terms whose
+    letters fold into other letters ("göt", "piç") would match ordinary words once folded
+    ("got", "epic"), so they keep their diacritics and are only searched in the casefolded
+    text, undoing leetspeak ("p1ç") and with spaces removed ("p i ç") as long as whole
+    words are joined."""
+    __slots__ = ("folded", "exact", "_marks")
+
+    def __init__(self, terms: Iterable[str]):
+        folded, exact = [], []
+        for term in terms:
+            form = normalize(term)
+            if folds_letters(form.text) and len(form.stripped) <= SHORT_TERM:
+                exact.append(form.text)
+            else:
+                folded.append(form.folded)
+        self.folded = WordMatcher(folded)
+        self.exact = WordMatcher(exact)
+        # Letters that tell the short terms apart from their folded lookalikes
+        self._marks = {char for term in self.exact.words for char in term if folds_letters(char)}
+
+    def __len__(self):
+        return len(self.folded) + len(self.exact)
+
+    def search(self, content: NormalizedText) -> Optional[str]:
+        """Returns the first term found in the message, or None."""
+        found = self.exact.search(content.text) or self.folded.search(content.folded)
+        if found:
+            return found
+        if self._marks and any(mark in content.text for mark in self._marks):
+            text = content.text.translate(_UNLEET)
+            found = (text != content.text and self.exact.search(text)) or self._search_spaced(text)
+            if found:
+                return found
+        if not self.folded:
+            return None
+        if self.folded.search(content.stripped) is None and self.folded.search(content.squeezed) is None:
+            return None
+        return self._search_joined(content)
+
+    def _search_spaced(self, text: str) -> Optional[str]:
+        # A short term split by spaces ("p i ç"), diacritics kept
+        words = text.split()
+        if len(words) < 2:
+            return None
+        bounds = [0, *accumulate(len(word) for word in words)]
+        for end, term in self.exact.finditer("".join(words)):
+            if _spans_words(bounds, end - len(term), end):
+                return term
+        return None
+
+    def _search_joined(self, content: NormalizedText) -> Optional[str]:
+        # Rare path: a term only shows up once spaces (and repeats) are removed. Such a hit
+        # counts only if it does not glue the end of one word to the start of another.
+        bounds = [0, *accumulate(len(word) for word in content.folded.split())]
+        for end, term in self.folded.finditer(content.stripped):
+            if _spans_words(bounds, end - len(term), end):
+                return term
+
+        # Map squeezed positions back to runs of the stripped text
+        starts, stops = [], []
+        position = 0
+        for _, run in groupby(content.stripped):
+            starts.append(position)
+            position += sum(1 for _ in run)
+            stops.append(position)
+        for end, term in self.folded.finditer(content.squeezed):
+            if _spans_words(bounds, starts[end - len(term)], stops[end - 1]):
+                return term
+        return None
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Tuple
+
+import discord
+
+from utils.ui import PremiumEmbed
+
+# Discord limits: embeds per message, description length, characters across all embeds of a message
+MAX_EMBEDS = 10
+MAX_DESCRIPTION = 4096
+MAX_MESSAGE_CHARS = 6000
+
+
+class ModLogBatcher:
+    """Buffers mod-log embeds per log channel and sends them in batches.
+
+    Up to 10 embeds (6000 characters in total) go out in one message, either when the
+    buffer is full or `flush_interval` seconds after the first one arrived. If a channel receives more
+    than `digest_threshold` entries within `digest_window` seconds, its buffer is
+    flushed as a digest instead: one line per action (nothing is left out), packed
+    into as few embeds as possible, one embed per message."""
+
+    def __init__(self, flush_interval: float = 2.0, digest_threshold: int = 20, digest_window: float = 10.0):
+        self.flush_interval = flush_interval
+        self.digest_threshold = digest_threshold
+        self.digest_window = digest_window
+        self.logger = logging.getLogger("ModLog")
+        self._buffers: Dict[int, Tuple[discord.abc.Messageable, List[Tuple[discord.Embed, str]]]] = {}
+        self._volume: Dict[int, Deque[float]] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+
+    def add(self, channel: discord.abc.Messageable, embed: discord.Embed, summary: str):
+        """Queues one log entry. `summary` is its single-line form used in digests."""
+        now = time.monotonic()
+        volume = self._volume.setdefault(channel.id, deque())
+        volume.append(now)
+        while now - volume[0] >= self.digest_window:
+            volume.popleft()
+
+        _, entries = self._buffers.setdefault(channel.id, (channel, []))
+        entries.append((embed, summary))
+
+        if len(volume) <= self.digest_threshold and len(entries) >= MAX_EMBEDS:
+            self._schedule(channel.id, 0)
+        elif channel.id not in self._timers:
+            self._schedule(channel.id, self.flush_interval)
+
+    def _schedule(self, channel_id: int, delay: float):
+        timer = self._timers.get(channel_id)
+        if timer:
+            if delay:
+                return
+            timer.cancel()
+        self._timers[channel_id] = asyncio.create_task(self._flush_later(channel_id, delay))
+
+    async def _flush_later(self, channel_id: int, delay: float):
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        self._timers.pop(channel_id, None)
+        await self.flush(channel_id)
+
+    async def flush(self, channel_id: int):
+        channel, entries = self._buffers.pop(channel_id, (None, []))
+        if not entries:
+            return
+
+        if len(entries) > MAX_EMBEDS and len(self._volume.get(channel_id, ())) > self.digest_threshold:
+            # A full digest embed is close to the per-message character limit on its own
+            batches = [[embed] for embed in self._digest(entries)]
+        else:
+            batches = self._batches([embed for embed, _ in entries])
+
+        for batch in batches:
+            try:
+                await channel.send(embeds=batch)
+            except discord.HTTPException as e:
+                # Keep going: one rejected message must not take the rest of the log with it
+                self.logger.error(f"Could not deliver {len(batch)} mod log embed(s) to {channel_id}: {e}")
+
+    @staticmethod
+    def _batches(embeds: List[discord.Embed]) -> List[List[discord.Embed]]:
+        """Groups embeds into messages of at most MAX_EMBEDS embeds and MAX_MESSAGE_CHARS characters."""
+        batches: List[List[discord.Embed]] = []
+        size = 0
+        for embed in embeds:
+            length = len(embed)
+            if not batches or len(batches[-1]) >= MAX_EMBEDS or size + length > MAX_MESSAGE_CHARS:
+                batches.append([])
+                size = 0
+            batches[-1].append(embed)
+            size += length
+        return batches
+
+    def _digest(self, entries: List[Tuple[discord.Embed, str]]) -> List[discord.Embed]:
+        counts = Counter(embed.title for embed, _ in entries)
+        embeds, lines, size = [], [], 0
+        for _, summary in entries:
+            if size + len(summary) + 1 > MAX_DESCRIPTION:
+                embeds.append(lines)
+                lines, size = [], 0
+            lines.append(summary)
+            size += len(summary) + 1
+        embeds.append(lines)
+
+        result = []
+        for index, chunk in enumerate(embeds, start=1):
+            title = f"🛡️ Moderasyon Özeti ({len(entries)} işlem)"
+            if len(embeds) > 1:
+                title += f" • {index}/{len(embeds)}"
+            embed = PremiumEmbed(title=title, description="\n".join(chunk), color=discord.Color.red())
+            if index == 1:
+                embed.add_field(name="Dağılım", value="\n".join(f"{action}: **{count}**" for action, count in counts.most_common(10)), inline=False)
+            result.append(embed)
+        return result
+
+    async def close(self):
+        """Sends everything still buffered."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        await asyncio.gather(*(self.flush(channel_id) for channel_id in list(self._buffers)), return_exceptions=True)
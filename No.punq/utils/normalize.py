@@ -0,0 +1,79 @@
+import re
+import unicodedata
+from typing import Dict, NamedTuple, Optional
+
+# Invisible characters used to split words without changing how they look
+ZERO_WIDTH = "\u200b\u200c\u200d\u2060\ufeff\u00ad\u180e"
+
+LEET = {"4": "a", "@": "a", "0": "o", "1": "i", "!": "i", "3": "e", "5": "s", "$": "s", "7": "t"}
+
+# Any character repeated two or more times in a row
+_REPEATS = re.compile(r"(.)\1+")
+
+
+def _fold_char(char: str) -> str:
+    """Matching form of one (already casefolded) character."""
+    if char in LEET:
+        return LEET[char]
+    if char == "ı":
+        return "i"
+    if unicodedata.combining(char):
+        return ""
+    code = ord(char)
+    if code < 0x0250 or 0x1E00 <= code <= 0x1EFF:
+        # Latin letters only: ş -> s, ö -> o, é -> e ... Other scripts are left alone
+        base = unicodedata.normalize("NFD", char)
+        return "".join(c for c in base if not unicodedata.combining(c))
+    return char
+
+
+def _build_fold_table() -> Dict[int, Optional[str]]:
+    # Input is already casefolded, so only lowercase Latin, digits, symbols and
+    # combining marks need entries; everything past U+2FFF maps to itself
+    table: Dict[int, Optional[str]] = {}
+    for code in range(0x3000):
+        char = chr(code)
+        fold = _fold_char(char)
+        if fold != char:
+            table[code] = fold or None
+    return table
+
+
+# Precompiled once at import
+_FOLD = _build_fold_table()
+_ZERO_WIDTH = re.compile(f"[{ZERO_WIDTH}]")
+
+
+class NormalizedText(NamedTuple):
+    text: str      # casefolded, zero-width characters removed (links, length checks)
+    folded: str    # plus Turkish i, diacritic and leetspeak folding (spaces kept)
+    stripped: str  # folded without any whitespace ("k ü f ü r" -> "kufur")
+    squeezed: str  # stripped with repeated characters collapsed ("kuuuufur" -> "kufur")
+
+
+def normalize(content: str) -> NormalizedText:
+    """Builds every form the message filters consume.
+
+    Each step is one C-level pass: casefold(), a single translate() through the fold
+    table, split/join for whitespace and one regex for repeats."""
+    text = content.casefold()
+    if "i\u0307" in text:
+        # Turkish capital dotted i casefolds to i + combining dot
+        text = text.replace("i\u0307", "i")
+    if _ZERO_WIDTH.search(text):
+        text = _ZERO_WIDTH.sub("", text)
+    folded = text.translate(_FOLD)
+    stripped = "".join(folded.split())
+    return NormalizedText(text, folded, stripped, _REPEATS.sub(r"\1", stripped))
+
+
+def folds_letters(text: str) -> bool:
+    """Whether folding turns a letter of `text` into a different letter (ö -> o, ı -> i).
+
+    For short filter terms that can change the word entirely (göt -> got, piç -> pic)."""
+    return any(char.isalpha() and _FOLD.get(ord(char), char) != char for char in text)
+
+
+def fold(word: str) -> str:
+    """Brings a filter term into the same form as NormalizedText.folded."""
+    return normalize(word).folded
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Pattern, Tuple
+
+try:
+    # Python 3.11+
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:
+    import sre_constants, sre_parse
+
+MAX_PATTERN_LENGTH = 200
+MAX_PATTERNS = 25
+# Product of the (max - min + 1) ranges of bounded quantifiers, i.e. how far a failed
+# match can backtrack on top of the single unbounded quantifier
+MAX_BACKTRACK = 1000
+# A search still running after BUDGET seconds is killed; STRIKES overruns disable the pattern
+BUDGET = 0.05
+STRIKES = 3
+
+REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, getattr(sre_constants, "POSSESSIVE_REPEAT", None)}
+
+
+class UnsafePattern(ValueError):
+    pass
+
+
+class _Shape:
+    __slots__ = ("unbounded", "backtrack")
+
+    def __init__(self):
+        self.unbounded = 0
+        self.backtrack = 1
+
+
+def _walk(items, shape: _Shape, in_repeat: bool):
+    for op, av in items:
+        if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            raise UnsafePattern("Geri referans (\\1) kullanılamaz.")
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            raise UnsafePattern("İleri / geri bakış ((?=...), (?<=...)) kullanılamaz.")
+
+        if op in REPEATS:
+            low, high, body = av
+            if low != high:
+                if in_repeat:
+                    raise UnsafePattern("İç içe tekrar ((a+)+ gibi) kullanılamaz.")
+                if high == sre_constants.MAXREPEAT:
+                    shape.unbounded += 1
+                else:
+                    shape.backtrack *= high - low + 1
+            _walk(body, shape, in_repeat or high > 1)
+        elif op == sre_constants.BRANCH:
+            if in_repeat:
+                raise UnsafePattern("Tekrar içinde alternatif ((a|ab)* gibi) kullanılamaz.")
+            for branch in av[1]:
+                _walk(branch, shape, in_repeat)
+        elif op == sre_constants.SUBPATTERN:
+            _walk(av[-1], shape, in_repeat)
+        elif op == getattr(sre_constants, "ATOMIC_GROUP", None):
+            _walk(av, shape, in_repeat)
+
+
+def compile_pattern(pattern: str) -> Pattern:
+    """Compiles an admin supplied pattern, case-insensitive.
+
+    Only a backtracking-safe subset is accepted: no backreferences, lookarounds,
+    nested quantifiers or alternation inside a quantifier, at most one unbounded
+    quantifier, and bounded ones limited to MAX_BACKTRACK combinations. This rejects
+    the catastrophic shapes up front; patterns that are still slow on some input are
+    bounded by PatternWorker's timeout. Raises UnsafePattern otherwise."""
+    if not pattern or len(pattern) > MAX_PATTERN_LENGTH:
+        raise UnsafePattern(f"Desen 1-{MAX_PATTERN_LENGTH} karakter olmalı.")
+    try:
+        parsed = sre_parse.parse(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise UnsafePattern(f"Geçersiz desen: {e}")
+
+    shape = _Shape()
+    _walk(parsed, shape, False)
+    if shape.unbounded > 1:
+        raise UnsafePattern("En fazla bir sınırsız tekrar (*, +, {n,}) kullanılabilir.")
+    if shape.backtrack > MAX_BACKTRACK:
+        raise UnsafePattern("Tekrar aralıkları çok geniş ({1,50}{1,50} gibi).")
+    return re.compile(pattern, re.IGNORECASE)
+
+
+class SearchTimeout(Exception):
+    def __init__(self, index: int, elapsed: float):
+        super().__init__(f"Regex search exceeded its budget ({elapsed * 1000:.0f} ms)")
+        self.index = index
+        self.elapsed = elapsed
+
+
+def _serve(requests, replies):
+    """Worker loop, one JSON request per line: compiles each guild's patterns once and
+    replies with the first match. The index of every pattern is reported before it is
+    searched, so the parent knows which one overran when it has to kill the worker."""
+    cache = {}
+    replies.write('{"ready": true}\n')
+    replies.flush()
+    for line in requests:
+        request = json.loads(line)
+        key, patterns = request["key"], request["patterns"]
+        entry = cache.get(key)
+        if entry is None or entry[0] != patterns:
+            entry = cache[key] = (patterns, [re.compile(pattern, re.IGNORECASE) for pattern in patterns])
+        result = None
+        for index, regex in enumerate(entry[1]):
+            replies.write(f'{{"at": {index}}}\n')
+            replies.flush()
+            match = regex.search(request["text"])
+            if match:
+                result = [index, match.group(0)]
+                break
+        replies.write(json.dumps({"match": result}) + "\n")
+        replies.flush()
+
+
+class PatternWorker:
+    """Runs regex searches in a child process that is killed once a search overruns.
+
+    Python's re cannot be interrupted, so a real time limit needs a separate process.
+    It is a plain `python -m utils.patterns` rather than a multiprocessing child, which
+    would import main.py (and a second bot) again. Searches are serialized; the blocking
+    pipe I/O runs in a thread, so the event loop never waits on a pattern."""
+
+    def __init__(self, timeout: float = BUDGET):
+        self.timeout = timeout
+        self.logger = logging.getLogger("Moderation")
+        self._lock = asyncio.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._replies: "queue.Queue[Optional[dict]]" = queue.Queue()
+
+    def _start(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "utils.patterns"], cwd=root,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8", bufsize=1
+        )
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read, args=(self._process.stdout, self._replies), name="regex-worker", daemon=True).start()
+        # Interpreter start-up must not count against the first search's budget
+        if self._replies.get(timeout=10) is None:
+            raise EOFError("worker exited")
+
+    @staticmethod
+    def _read(stream, replies: "queue.Queue[Optional[dict]]"):
+        for line in stream:
+            replies.put(json.loads(line))
+        replies.put(None)
+
+    def _stop(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process.stdin.close()
+        self._process = None
+
+    def _call(self, key: str, patterns: Tuple[str, ...], text: str) -> Optional[Tuple[int, str]]:
+        try:
+            if self._process is None or self._process.poll() is not None:
+                self._stop()
+                self._start()
+        except (queue.Empty, EOFError, OSError) as e:
+            self.logger.error(f"Regex worker could not start: {e}")
+            self._stop()
+            return None
+        index = 0
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        try:
+            self._process.stdin.write(json.dumps({"key": key, "patterns": patterns, "text": text}) + "\n")
+            self._process.stdin.flush()
+            while True:
+                reply = self._replies.get(timeout=max(0.0, deadline - time.perf_counter()))
+                if reply is None:
+                    raise EOFError("worker exited")
+                if "at" in reply:
+                    index = reply["at"]
+                    continue
+                return tuple(reply["match"]) if reply["match"] else None
+        except queue.Empty:
+            self._stop()
+            raise SearchTimeout(index, time.perf_counter() - start)
+        except (EOFError, OSError, ValueError) as e:
+            self.logger.error(f"Regex worker failed: {e}")
+            self._stop()
+            return None
+
+    async def search(self, key: str, patterns: Tuple[str, ...], text: str) -> Optional[Tuple[int, str]]:
+        """Returns (pattern index, matched text) of the first match, or None.
+        Raises SearchTimeout if the search did not finish within the budget."""
+        async with self._lock:
+            return await asyncio.to_thread(self._call, key, patterns, text)
+
+    async def close(self):
+        async with self._lock:
+            await asyncio.to_thread(self._stop)
+
+
+class PatternSet:
+    """The enabled regex rules of one guild, validated once and searched by a PatternWorker."""
+
+    def __init__(self, key: str, rules: Iterable[Mapping], strikes: int = STRIKES):
+        self.key = key
+        self.strikes = strikes
+        self.overruns: Dict[str, int] = {}
+        patterns = []
+        for rule in rules:
+            if not rule.get("enabled", True):
+                continue
+            try:
+                compile_pattern(rule["pattern"])
+                patterns.append(rule["pattern"])
+            except (KeyError, UnsafePattern) as e:
+                logging.getLogger("Moderation").warning(f"Skipping regex rule {rule!r}: {e}")
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    async def search(self, worker: PatternWorker, text: str) -> Tuple[Optional[Tuple[str, str]], List[Tuple[str, float]]]:
+        """Returns ((pattern, matched text) or None, [(pattern, seconds)] of a pattern that
+        just used up its strikes). Such a pattern is dropped from the set right away."""
+        # Indexes from the worker refer to this tuple; a concurrent search may drop a
+        # pattern from self.patterns while this one waits
+        patterns = self.patterns
+        if not patterns:
+            return None, []
+        try:
+            result = await worker.search(self.key, patterns, text)
+        except SearchTimeout as e:
+            pattern = patterns[e.index]
+            if pattern not in self.patterns:
+                # Already disabled by another search
+                return None, []
+            self.overruns[pattern] = self.overruns.get(pattern, 0) + 1
+            if self.overruns[pattern] < self.strikes:
+                return None, []
+            self.patterns = tuple(p for p in self.patterns if p != pattern)
+            return None, [(pattern, e.elapsed)]
+        if result is None:
+            return None, []
+        index, matched = result
+        return (patterns[index], matched), []
+
+
+if __name__ == "__main__":
+    _serve(sys.stdin, sys.stdout)
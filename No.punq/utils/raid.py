@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+# Number of min-hashes per fingerprint and how many must agree for "near-identical"
+HASHES = 8
+MIN_MATCHES = 6
+# (odd multiplier, addend) of one multiply-shift permutation of the 64-bit hash space per min-hash
+PERMUTATIONS = (
+    (0x9E3779B97F4A7C15, 0x632BE59BD9B4E019), (0xC2B2AE3D27D4EB4F, 0x85EBCA77C2B2AE63),
+    (0xD6E8FEB86659FD93, 0x27D4EB2F165667C5), (0xFF51AFD7ED558CCD, 0x94D049BB133111EB),
+    (0xA0761D6478BD642F, 0xE7037ED1A0B428DB), (0x8EBC6AF09C88C6E3, 0x589965CC75374CC3),
+    (0x1D8E4E27C47D124F, 0xBF58476D1CE4E5B9), (0xDB4F0B9175AE2165, 0x4CF5AD432745937F)
+)
+MASK = (1 << 64) - 1
+SHINGLE = 3
+# Shorter messages ("gg", "selam") are too common to fingerprint
+MIN_LENGTH = 12
+# Copy-pasted raids already agree on their opening, longer messages are cut here
+MAX_LENGTH = 500
+
+
+def fingerprint(text: str) -> Optional[Tuple[int, ...]]:
+    """MinHash signature over the character 3-grams of a normalized message."""
+    if len(text) < MIN_LENGTH:
+        return None
+    text = text[:MAX_LENGTH]
+    hashes = set(map(hash, (text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1))))
+    # Each (a * h + b) mod 2^64 reorders the whole hash space, high bits included, so every
+    # permutation picks its minimum independently of the others
+    return tuple(min([(a * h + b) & MASK for h in hashes]) for a, b in PERMUTATIONS[:HASHES])
+
+
+class _Post:
+    __slots__ = ("time", "user_id", "message_id", "signature", "flagged")
+
+    def __init__(self, now: float, user_id: int, message_id: int, signature: Tuple[int, ...]):
+        self.time = now
+        self.user_id = user_id
+        self.message_id = message_id
+        self.signature = signature
+        self.flagged = False
+
+
+class _Channel:
+    """Bounded ring of recent posts plus an index from (slot, min-hash) to posts."""
+    __slots__ = ("ring", "index")
+
+    def __init__(self):
+        self.ring: Deque[_Post] = deque()
+        self.index: Dict[Tuple[int, int], Set[_Post]] = {}
+
+    def add(self, post: _Post, size: int):
+        if len(self.ring) >= size:
+            self.remove_oldest()
+        self.ring.append(post)
+        for slot, value in enumerate(post.signature):
+            self.index.setdefault((slot, value), set()).add(post)
+
+    def remove_oldest(self):
+        post = self.ring.popleft()
+        for slot, value in enumerate(post.signature):
+            bucket = self.index.get((slot, value))
+            if bucket is not None:
+                bucket.discard(post)
+                if not bucket:
+                    del self.index[(slot, value)]
+
+
+class RaidDetector:
+    """Flags near-identical messages posted by many different users in one channel.
+
+    Every channel keeps at most `ring_size` recent fingerprints, so memory per channel
+    is constant and a lookup only touches the posts sharing one of the message's
+    min-hashes. Once a cluster of `users` distinct authors within `window` seconds is
+    found, the cluster is flagged and later copies are reported right away until they
+    age out of the window."""
+
+    def __init__(self, ring_size: int = 64, max_channels: int = 5000):
+        self.ring_size = ring_size
+        self.max_channels = max_channels
+        self._channels: "OrderedDict[int, _Channel]" = OrderedDict()
+
+    def check(self, channel_id: int, user_id: int, message_id: int, text: str, users: int, window: float,
+              now: Optional[float] = None) -> Optional[List[Tuple[int, int]]]:
+        """Records a message. Returns the (user id, message id) pairs to act on when the
+        message belongs to a raid, None otherwise."""
+        signature = fingerprint(text)
+        if signature is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self._channels[channel_id] = _Channel()
+            if len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        self._channels.move_to_end(channel_id)
+
+        while channel.ring and now - channel.ring[0].time >= window:
+            channel.remove_oldest()
+
+        matches: Dict[_Post, int] = {}
+        for slot, value in enumerate(signature):
+            for other in channel.index.get((slot, value), ()):
+                matches[other] = matches.get(other, 0) + 1
+        similar = [other for other, count in matches.items() if count >= MIN_MATCHES]
+
+        post = _Post(now, user_id, message_id, signature)
+        channel.add(post, self.ring_size)
+
+        if any(other.flagged for other in similar):
+            # Raid already detected, this is one more copy
+            post.flagged = True
+            return [(user_id, message_id)]
+
+        cluster = similar + [post]
+        if len({member.user_id for member in cluster}) < users:
+            return None
+        for member in cluster:
+            member.flagged = True
+        return [(member.user_id, member.message_id) for member in cluster]
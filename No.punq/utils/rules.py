@@ -0,0 +1,192 @@
+import inspect
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from utils.links import extract_hosts
+from utils.normalize import NormalizedText, normalize
+
+# What a rule may read from a MessageContext. "content" and "hosts" are computed on
+# first use and shared, so a message that only meets cheap rules is never normalized.
+INPUTS = ("message", "author", "content", "hosts")
+
+
+class Verdict(NamedTuple):
+    reason: str
+    match: Optional[str] = None
+    # (channel id, message id) pairs to remove; None removes just the checked message
+    messages: Optional[List[Tuple[int, int]]] = None
+    # Member ids to punish instead of the message author
+    users: Optional[Iterable[int]] = None
+
+
+class MessageContext:
+    """A message and its guild's moderation config, with derived inputs cached per message."""
+    __slots__ = ("message", "config", "edited", "_content", "_hosts")
+
+    def __init__(self, message, config: Mapping[str, Any], edited: bool = False):
+        self.message = message
+        self.config = config
+        self.edited = edited
+        self._content: Optional[NormalizedText] = None
+        self._hosts: Optional[List[str]] = None
+
+    @property
+    def author(self):
+        return self.message.author
+
+    @property
+    def content(self) -> NormalizedText:
+        # Casefolded, de-obfuscated forms ("K ü f 3 r", zero-width splits, leetspeak ...)
+        if self._content is None:
+            self._content = normalize(self.message.content)
+        return self._content
+
+    @property
+    def hosts(self) -> List[str]:
+        if self._hosts is None:
+            text = self.content.text
+            self._hosts = extract_hosts(text) if "." in text else []
+        return self._hosts
+
+
+class ContentHashes:
+    """LRU of {message id: content hash} for recently scanned messages."""
+
+    def __init__(self, max_size: int = 20000):
+        self.max_size = max_size
+        self._hashes: "OrderedDict[int, int]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def seen(self, message_id: int, content: str) -> bool:
+        """Records the content of a message. Returns True if it was already scanned with this text."""
+        digest = hash(content)
+        previous = self._hashes.get(message_id)
+        self._hashes[message_id] = digest
+        self._hashes.move_to_end(message_id)
+        if len(self._hashes) > self.max_size:
+            self._hashes.popitem(last=False)
+        return previous == digest
+
+
+class Rule:
+    """One automod check.
+
+    Subclasses set `name`, `cost` (relative, lower runs first), the `inputs` they read
+    and implement check(), which may be a coroutine for rules that wait on something
+    (regex rules run in a worker process). Rules with `custom = True` only run in guilds that list their
+    name in `custom_rules`, so opt-in rules add no latency anywhere else. Rules that
+    track message rates set `edits = False` and are skipped for edited messages."""
+    name = "rule"
+    cost = 10
+    inputs: Tuple[str, ...] = ("message",)
+    custom = False
+    edits = True
+
+    def enabled(self, config: Mapping[str, Any]) -> bool:
+        return True
+
+    def check(self, ctx: MessageContext) -> Optional[Verdict]:
+        raise NotImplementedError
+
+
+class RuleStats:
+    __slots__ = ("runs", "hits", "errors", "total_ns", "latencies")
+
+    def __init__(self):
+        self.runs = 0
+        self.hits = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.latencies: Deque[int] = deque(maxlen=512)
+
+    def record(self, elapsed: int, hit: bool):
+        self.runs += 1
+        self.hits += hit
+        self.total_ns += elapsed
+        self.latencies.append(elapsed)
+
+
+class RuleEngine:
+    """Runs rules cheapest-first and stops at the first verdict.
+
+    Each check is timed; the time spent computing a shared input is charged to the
+    first rule that asked for it."""
+
+    def __init__(self, rules: Iterable[Rule] = ()):
+        self.logger = logging.getLogger("Rules")
+        self.rules: List[Rule] = []
+        self._stats: Dict[str, RuleStats] = {}
+        for rule in rules:
+            self.register(rule)
+
+    def register(self, rule: Rule):
+        unknown = set(rule.inputs) - set(INPUTS)
+        if unknown:
+            raise ValueError(f"Rule {rule.name} reads unknown inputs: {', '.join(sorted(unknown))}")
+        self.unregister(rule.name)
+        self.rules.append(rule)
+        # Stable sort: equal costs keep their registration order
+        self.rules.sort(key=lambda r: r.cost)
+        self._stats[rule.name] = RuleStats()
+
+    def unregister(self, name: str) -> bool:
+        for rule in self.rules:
+            if rule.name == name:
+                self.rules.remove(rule)
+                del self._stats[name]
+                return True
+        return False
+
+    def get(self, name: str) -> Optional[Rule]:
+        return next((rule for rule in self.rules if rule.name == name), None)
+
+    async def evaluate(self, ctx: MessageContext) -> Optional[Tuple[Rule, Verdict]]:
+        custom = ctx.config.get("custom_rules") or ()
+        for rule in self.rules:
+            if rule.custom and rule.name not in custom:
+                continue
+            if ctx.edited and not rule.edits:
+                continue
+            if not rule.enabled(ctx.config):
+                continue
+            stats = self._stats[rule.name]
+            start = time.perf_counter_ns()
+            try:
+                verdict = rule.check(ctx)
+                if inspect.isawaitable(verdict):
+                    verdict = await verdict
+            except Exception as e:
+                stats.errors += 1
+                self.logger.error(f"Rule {rule.name} failed: {e}")
+                verdict = None
+            stats.record(time.perf_counter_ns() - start, verdict is not None)
+            if verdict:
+                return rule, verdict
+        return None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-rule counters and latency (microseconds), in execution order."""
+        result = []
+        for rule in self.rules:
+            stats = self._stats[rule.name]
+            latencies = sorted(stats.latencies)
+
+            def percentile(p: float) -> float:
+                return latencies[min(len(latencies) - 1, int(len(latencies) * p))] / 1000 if latencies else 0.0
+
+            result.append({
+                "name": rule.name,
+                "cost": rule.cost,
+                "custom": rule.custom,
+                "runs": stats.runs,
+                "hits": stats.hits,
+                "errors": stats.errors,
+                "mean_us": stats.total_ns / stats.runs / 1000 if stats.runs else 0.0,
+                "p50_us": percentile(0.5),
+                "p99_us": percentile(0.99)
+            })
+        return result
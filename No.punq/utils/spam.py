@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+# (monotonic time, channel id, message id)
+Entry = Tuple[float, int, int]
+
+
+class SpamTracker:
+    """Sliding-window message rate tracker keyed by (guild, user).
+
+    Each member gets a deque of (monotonic time, channel, message) entries capped at
+    threshold + 1, so a hit is O(1) amortized and the messages of a detected flood are
+    known without fetching history. Members are kept in least-recently-active order:
+    idle ones (nothing for `ttl` seconds) and anything beyond `max_members` are evicted
+    from the front as new messages arrive, instead of wiping everyone periodically."""
+
+    def __init__(self, ttl: float = 120.0, max_members: int = 50000):
+        self.ttl = ttl
+        self.max_members = max_members
+        self._windows: "OrderedDict[Tuple[int, int], Deque[Entry]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def hit(self, guild_id: int, user_id: int, channel_id: int, message_id: int, threshold: int, window: float,
+            now: Optional[float] = None) -> Optional[List[Tuple[int, int]]]:
+        """Records a message. Once more than `threshold` messages arrived within `window`
+        seconds, resets the member and returns their (channel id, message id) pairs in
+        that window. Returns None otherwise."""
+        if now is None:
+            now = time.monotonic()
+        key = (guild_id, user_id)
+        timestamps = self._windows.get(key)
+        if timestamps is None or timestamps.maxlen != threshold + 1:
+            # New member, or the guild changed its threshold
+            timestamps = self._windows[key] = deque(timestamps or (), maxlen=threshold + 1)
+        self._windows.move_to_end(key)
+
+        timestamps.append((now, channel_id, message_id))
+        while now - timestamps[0][0] >= window:
+            timestamps.popleft()
+
+        flood = None
+        if len(timestamps) > threshold:
+            flood = [(channel, message) for _, channel, message in timestamps]
+            # Reset to prevent loop kick
+            timestamps.clear()
+        self._evict(now)
+        return flood
+
+    def forget(self, guild_id: int, user_id: int):
+        self._windows.pop((guild_id, user_id), None)
+
+    def _evict(self, now: float):
+        windows = self._windows
+        while windows:
+            key, timestamps = next(iter(windows.items()))
+            if len(windows) <= self.max_members and timestamps and now - timestamps[-1][0] < self.ttl:
+                break
+            del windows[key]
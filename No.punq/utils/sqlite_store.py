@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.warns import WarnStore, parse_timestamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id TEXT NOT NULL,
+    module   TEXT NOT NULL,
+    data     TEXT NOT NULL,
+    PRIMARY KEY (guild_id, module)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS warns (
+    id         INTEGER PRIMARY KEY,
+    guild_id   TEXT NOT NULL,
+    user_id    TEXT NOT NULL,
+    reason     TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_warns_member ON warns (guild_id, user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteStore:
+    """SQLite storage used by Database when storage is set to "sqlite".
+
+    Guild configs are kept as one row per (guild, module), warns live in their own
+    indexed table. A single connection is owned by a dedicated worker thread, so
+    every statement runs off the event loop and in submission order."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.logger = logging.getLogger("Database")
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        await self._run(self._open)
+
+    def _open(self):
+        self._conn = connect(self.path)
+
+    async def close(self):
+        if not self._executor:
+            return
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    async def load_configs(self) -> Dict[str, Dict[str, Any]]:
+        """Returns every stored guild config as {guild_id: {module: value}}."""
+        return await self._run(self._load_configs)
+
+    def _load_configs(self) -> Dict[str, Dict[str, Any]]:
+        data: Dict[str, Dict[str, Any]] = {}
+        for guild_id, module, raw in self._conn.execute("SELECT guild_id, module, data FROM guild_config"):
+            data.setdefault(guild_id, {})[module] = json.loads(raw)
+        return data
+
+    async def get_meta(self, key: str, default: Any = None) -> Any:
+        return await self._run(self._get_meta, key, default)
+
+    def _get_meta(self, key: str, default: Any = None) -> Any:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    async def set_meta(self, key: str, value: Any):
+        await self._run(self._set_meta, key, value)
+
+    def _set_meta(self, key: str, value: Any):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    async def write_guilds(self, rows: List[Tuple[str, Dict[str, str]]], deleted: List[str]):
+        """Replaces the module rows of the given guilds (values already JSON encoded)."""
+        await self._run(self._write_guilds, rows, deleted)
+
+    def _write_guilds(self, rows: List[Tuple[str, Dict[str, str]]], deleted: List[str]):
+        with self._conn:
+            for guild_id in deleted:
+                self._conn.execute("DELETE FROM guild_config WHERE guild_id = ?", (guild_id,))
+            for guild_id, modules in rows:
+                self._conn.execute("DELETE FROM guild_config WHERE guild_id = ?", (guild_id,))
+                self._conn.executemany(
+                    "INSERT INTO guild_config (guild_id, module, data) VALUES (?, ?, ?)",
+                    [(guild_id, module, raw) for module, raw in modules.items()]
+                )
+
+    async def add_warn(self, guild_id: str, user_id: str, reason: str, created_at: int, since: int = 0) -> int:
+        """Stores a warn and returns how many of the member's warns are newer than `since`."""
+        return await self._run(self._add_warn, guild_id, user_id, reason, created_at, since)
+
+    def _add_warn(self, guild_id: str, user_id: str, reason: str, created_at: int, since: int) -> int:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO warns (guild_id, user_id, reason, created_at) VALUES (?, ?, ?, ?)",
+                (guild_id, user_id, reason, created_at)
+            )
+        return self._count_warns(guild_id, user_id, since)
+
+    async def count_warns(self, guild_id: str, user_id: str, since: int = 0) -> int:
+        return await self._run(self._count_warns, guild_id, user_id, since)
+
+    def _count_warns(self, guild_id: str, user_id: str, since: int) -> int:
+        # Served by idx_warns_member, no table scan
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM warns WHERE guild_id = ? AND user_id = ? AND created_at >= ?",
+            (guild_id, user_id, since)
+        ).fetchone()[0]
+
+    async def import_warns(self, rows: List[Tuple[str, str, int, str]]):
+        """Bulk inserts (guild_id, user_id, created_at, reason) rows."""
+        await self._run(self._import_warns, rows)
+
+    def _import_warns(self, rows: List[Tuple[str, str, int, str]]):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO warns (guild_id, user_id, created_at, reason) VALUES (?, ?, ?, ?)", rows
+            )
+
+    async def prune_warns(self, before: int) -> int:
+        """Deletes warns older than the retention cutoff."""
+        return await self._run(self._prune_warns, before)
+
+    def _prune_warns(self, before: int) -> int:
+        with self._conn:
+            return self._conn.execute("DELETE FROM warns WHERE created_at < ?", (before,)).rowcount
+
+    async def clear_warns(self, guild_id: str, user_id: str) -> bool:
+        return await self._run(self._clear_warns, guild_id, user_id)
+
+    def _clear_warns(self, guild_id: str, user_id: str) -> bool:
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM warns WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+        return cursor.rowcount > 0
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def read_warns_file(path: str) -> WarnStore:
+    """Loads the <db>.warns.json file that schema v3+ keeps next to database.json."""
+    warns = WarnStore(retention_days=0)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        document = json.loads(content) if content.strip() else {}
+        meta = document.pop("_meta", {})
+        warns.load(meta.get("reasons", []), document)
+    return warns
+
+
+def migrate_json(json_path: str, sqlite_path: str, force: bool = False) -> Tuple[int, int]:
+    """One-shot import of a database.json file and its warns file. Returns (guilds, warns) imported."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    data = json.loads(content) if content.strip() else {}
+    meta = data.pop("_meta", {})
+    stored_warns = read_warns_file(os.path.splitext(json_path)[0] + ".warns.json")
+
+    conn = connect(sqlite_path)
+    try:
+        if not force and conn.execute("SELECT 1 FROM guild_config LIMIT 1").fetchone():
+            raise RuntimeError(f"{sqlite_path} already contains data, pass --force to import anyway.")
+
+        guilds = warns = 0
+        with conn:
+            for guild_id, config in data.items():
+                if not isinstance(config, dict):
+                    continue
+                users = config.pop("users", {}) or {}
+                conn.execute("DELETE FROM guild_config WHERE guild_id = ?", (guild_id,))
+                conn.executemany(
+                    "INSERT INTO guild_config (guild_id, module, data) VALUES (?, ?, ?)",
+                    [(guild_id, module, json.dumps(value, ensure_ascii=False)) for module, value in config.items()]
+                )
+                guilds += 1
+                rows: Iterable = (
+                    (guild_id, user_id, w.get("reason", ""), parse_timestamp(w.get("timestamp")))
+                    for user_id, user in users.items()
+                    for w in user.get("warns", [])
+                )
+                cursor = conn.executemany(
+                    "INSERT INTO warns (guild_id, user_id, reason, created_at) VALUES (?, ?, ?, ?)", rows
+                )
+                warns += max(cursor.rowcount, 0)
+            cursor = conn.executemany(
+                "INSERT INTO warns (guild_id, user_id, created_at, reason) VALUES (?, ?, ?, ?)", stored_warns.items()
+            )
+            warns += max(cursor.rowcount, 0)
+            # Without it, loading would re-run migrations the JSON data already went through
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                ("schema_version", json.dumps(meta.get("schema_version", 0)))
+            )
+        return guilds, warns
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Imports database.json into the SQLite backend.")
+    parser.add_argument("source", nargs="?", default="utils/database.json")
+    parser.add_argument("target", nargs="?", default=None, help="Defaults to the source path with a .db extension")
+    parser.add_argument("--force", action="store_true", help="Import even if the target already has data")
+    args = parser.parse_args()
+
+    target = args.target or os.path.splitext(args.source)[0] + ".db"
+    imported_guilds, imported_warns = migrate_json(args.source, target, args.force)
+    print(f"Imported {imported_guilds} guilds and {imported_warns} warns into {target}")
@@ -0,0 +1,138 @@
+import datetime
+import json
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+DAY = 86400
+
+
+def parse_timestamp(value: str) -> int:
+    """Converts the legacy "%Y-%m-%d %H:%M:%S" (UTC) warn timestamps to epoch seconds."""
+    try:
+        parsed = datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+        return int(parsed.replace(tzinfo=datetime.timezone.utc).timestamp())
+    except (TypeError, ValueError):
+        return 0
+
+
+class WarnHistory:
+    """Warns of one member: parallel arrays of epoch seconds (kept sorted) and reason ids."""
+    __slots__ = ("times", "reasons")
+
+    def __init__(self):
+        self.times = array("q")
+        self.reasons = array("I")
+
+    def add(self, created_at: int, reason_id: int):
+        if not self.times or created_at >= self.times[-1]:
+            self.times.append(created_at)
+            self.reasons.append(reason_id)
+        else:
+            index = bisect_left(self.times, created_at)
+            self.times.insert(index, created_at)
+            self.reasons.insert(index, reason_id)
+
+    def count_since(self, since: int) -> int:
+        return len(self.times) - bisect_left(self.times, since)
+
+    def drop_before(self, cutoff: int) -> int:
+        index = bisect_left(self.times, cutoff)
+        if index:
+            del self.times[:index]
+            del self.reasons[:index]
+        return index
+
+
+class WarnStore:
+    """Warn history kept apart from the guild configs, keyed by (guild, user).
+
+    Records are compact (epoch, reason id) pairs with reason strings interned once.
+    History is sorted by time, so counting the warns inside a decay window is a
+    binary search instead of a scan. Warns older than the retention window are
+    dropped whenever a member's history is touched and on prune()."""
+
+    def __init__(self, retention_days: int = 90):
+        self.retention_days = retention_days
+        self.reasons: List[str] = []
+        self._reason_ids: Dict[str, int] = {}
+        self.members: Dict[str, WarnHistory] = {}
+        self.dirty: Set[str] = set()
+
+    @staticmethod
+    def key(guild_id: str, user_id: str) -> str:
+        return f"{guild_id}:{user_id}"
+
+    def _cutoff(self, now: int) -> int:
+        return now - self.retention_days * DAY if self.retention_days > 0 else 0
+
+    def _reason_id(self, reason: str) -> int:
+        reason_id = self._reason_ids.get(reason)
+        if reason_id is None:
+            reason_id = self._reason_ids[reason] = len(self.reasons)
+            self.reasons.append(reason)
+        return reason_id
+
+    def add(self, guild_id: str, user_id: str, reason: str, created_at: int):
+        key = self.key(guild_id, user_id)
+        history = self.members.get(key)
+        if history is None:
+            history = self.members[key] = WarnHistory()
+        history.drop_before(self._cutoff(created_at))
+        history.add(created_at, self._reason_id(reason))
+        self.dirty.add(key)
+
+    def count(self, guild_id: str, user_id: str, since: int = 0) -> int:
+        """Number of warns issued at or after `since` (epoch seconds)."""
+        history = self.members.get(self.key(guild_id, user_id))
+        return history.count_since(since) if history else 0
+
+    def clear(self, guild_id: str, user_id: str) -> bool:
+        key = self.key(guild_id, user_id)
+        if self.members.pop(key, None) is None:
+            return False
+        self.dirty.add(key)
+        return True
+
+    def history(self, guild_id: str, user_id: str) -> List[Tuple[int, str]]:
+        history = self.members.get(self.key(guild_id, user_id))
+        if not history:
+            return []
+        return [(t, self.reasons[r]) for t, r in zip(history.times, history.reasons)]
+
+    def prune(self, now: int) -> int:
+        """Drops every warn older than the retention window. Returns how many were removed."""
+        cutoff = self._cutoff(now)
+        removed = 0
+        for key in list(self.members):
+            history = self.members[key]
+            dropped = history.drop_before(cutoff)
+            if dropped:
+                removed += dropped
+                self.dirty.add(key)
+                if not history.times:
+                    del self.members[key]
+        return removed
+
+    def items(self) -> Iterator[Tuple[str, str, int, str]]:
+        """Yields (guild_id, user_id, created_at, reason) for every stored warn."""
+        for key, history in self.members.items():
+            guild_id, user_id = key.split(":", 1)
+            for t, r in zip(history.times, history.reasons):
+                yield guild_id, user_id, t, self.reasons[r]
+
+    def encode_member(self, key: str) -> Optional[str]:
+        history = self.members.get(key)
+        if history is None:
+            return None
+        return json.dumps([history.times.tolist(), history.reasons.tolist()])
+
+    def load(self, reasons: List[str], members: Dict[str, Any]):
+        self.reasons = list(reasons)
+        self._reason_ids = {reason: i for i, reason in enumerate(self.reasons)}
+        self.members = {}
+        for key, (times, reason_ids) in members.items():
+            history = self.members[key] = WarnHistory()
+            history.times.extend(times)
+            history.reasons.extend(reason_ids)
+        self.dirty.clear()